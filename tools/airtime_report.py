@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# airtime_report.py
+# Version 1.0 - 2025-03-26
+# Reports bytes-on-air per packet type for the old C|<hex> compression versus the
+# binary COMPRESSED_FLAG payloads used by server v4.0.5 / terminal_client v5.0.2,
+# and round-trips every frame through KISS escaping to check the codec.
+#
+# Usage: python3 tools/airtime_report.py [--csv-dir internal/CVS] [--baud 1200] [--paclen 255]
+# Exits non-zero if any frame fails to round-trip.
+
+import argparse
+import binascii
+import glob
+import hashlib
+import os
+import random
+import sys
+import types
+import zlib
+
+COMPRESSED_FLAG = b'\xff'
+LEGACY_COMPRESSED = ('G', 'P')  # Only CMS GET/POST (and push U) were compressed before v4.0.5 / v5.0.2
+PACLEN_HINT = 223  # One full G chunk at PACLEN 255
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+CODEC_SOURCE = os.path.join(REPO_DIR, 'lib', 'common', 'ax25_codec.txt')
+METRICS_SOURCE = os.path.join(REPO_DIR, 'lib', 'common', 'metrics.txt')
+
+def load_codec():
+    """lib/common/ax25_codec.txt as the ax25_codec module, so programs exec'd from their .txt can import it."""
+    if 'ax25_codec' not in sys.modules:
+        module = types.ModuleType('ax25_codec')
+        module.__file__ = CODEC_SOURCE
+        exec(compile(open(CODEC_SOURCE).read(), CODEC_SOURCE, 'exec'), module.__dict__)
+        sys.modules['ax25_codec'] = module
+    return sys.modules['ax25_codec']
+
+def load_metrics():
+    """lib/common/metrics.txt as the metrics module, for server v4.0.24, terminal_client v5.0.17 and Fake Direwolf v1.11."""
+    if 'metrics' not in sys.modules:
+        module = types.ModuleType('metrics')
+        module.__file__ = METRICS_SOURCE
+        exec(compile(open(METRICS_SOURCE).read(), METRICS_SOURCE, 'exec'), module.__dict__)
+        sys.modules['metrics'] = module
+    return sys.modules['metrics']
+
+def crc16(data):
+    # crc-ccitt-false, same as crcmod.predefined.mkCrcFun('crc-ccitt-false')
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def encode_callsign(callsign, ssid=0, last=False):
+    callsign = callsign.ljust(6)[:6].upper()
+    return bytes([ord(c) << 1 for c in callsign]) + bytes([0x60 | (ssid << 1) | (1 if last else 0)])
+
+def ax25_frame(source, dest, info):
+    frame = encode_callsign(dest) + encode_callsign(source, last=True) + b'\x03\xF0' + info
+    return b'\x7E' + frame + crc16(frame).to_bytes(2, 'little') + b'\x7E'
+
+def kiss_escape(ax25_packet):
+    return b'\xC0\x00' + ax25_packet.replace(b'\xDB', b'\xDB\xDD').replace(b'\xC0', b'\xDB\xDC') + b'\xC0'
+
+def kiss_unescape(kiss_data):
+    out = bytearray()
+    i = 0
+    while i < len(kiss_data):
+        b = kiss_data[i]
+        if b == 0xDB and i + 1 < len(kiss_data):
+            nxt = kiss_data[i + 1]
+            out.append(0xC0 if nxt == 0xDC else 0xDB if nxt == 0xDD else nxt)
+            i += 2
+            continue
+        out.append(b)
+        i += 1
+    return bytes(out)
+
+def split_payload(payload, paclen):
+    max_payload = paclen - 32
+    if len(payload) <= max_payload:
+        return [payload]
+    parts = [payload[i:i + max_payload] for i in range(0, len(payload), max_payload)]
+    return [f"{i+1}:{len(parts)}|{part}" for i, part in enumerate(parts)]
+
+def info_before(part, compress):
+    # v4.0.1 / v5.0.0 behaviour: C|<hex of zlib>, split after hex expansion
+    return f"C|{zlib.compress(part.encode()).hex()}".encode() if compress else part.encode()
+
+def info_after(part, compress):
+    raw = part.encode()
+    if compress:
+        packed = COMPRESSED_FLAG + zlib.compress(raw, 9)
+        if len(packed) < len(raw):
+            return packed
+    return raw
+
+def decode_after(info):
+    if info[:1] == COMPRESSED_FLAG:
+        info = zlib.decompress(info[1:])
+    return info.decode('ascii')
+
+def frames_before(payload, compress, paclen):
+    if compress:
+        payload = info_before(payload, True).decode()
+    return [kiss_escape(ax25_frame("SVR001", "ALL", p.encode())) for p in split_payload(payload, paclen)]
+
+def frames_after(payload, compress, paclen):
+    return [kiss_escape(ax25_frame("SVR001", "ALL", info_after(p, compress))) for p in split_payload(payload, paclen)]
+
+def check_round_trip(payload, compress, paclen):
+    parts = split_payload(payload, paclen)
+    for part, kiss in zip(parts, frames_after(payload, compress, paclen)):
+        assert kiss[0] == 0xC0 and kiss[-1] == 0xC0 and b'\xC0' not in kiss[1:-1], "unescaped FEND inside frame"
+        ax25 = kiss_unescape(kiss[2:-1])
+        body = ax25[1:-3]
+        assert crc16(body).to_bytes(2, 'little') == ax25[-3:-1], "FCS mismatch after unescape"
+        assert decode_after(ax25[17:-3]) == part, "payload mismatch after decode"
+
+def sample_payloads(csv_dir):
+    """Representative payloads per packet type, built from the sample submission CSVs."""
+    rows = {}
+    for path in sorted(glob.glob(os.path.join(csv_dir, '*_submissions.csv'))):
+        form_id = os.path.basename(path)[:-len('_submissions.csv')]
+        with open(path) as f:
+            rows[form_id] = [line.strip().split(',', 2)[2] for line in f if line.count(',') >= 2]
+    samples = {}
+    md5 = hashlib.md5(b'forms').hexdigest()
+    samples['M'] = [(f"M|SVR001|NONE|{md5}", False)]
+    samples['X'] = [("X|CLT001|NONE|" + '|'.join(f"{fid}:{hashlib.md5(fid.encode()).hexdigest()}" for fid in rows), False)]
+    samples['A'] = [(f"A|SVR001|{fid}|SUCCESS", False) for fid in rows]
+    samples['I'] = [(f"I|CLT001|{fid}|{row}", True) for fid, form_rows in rows.items() for row in form_rows]
+    samples['S'] = [(f"S|CLT001|{fid}|{form_rows[0].split('|')[0][:4]}", True) for fid, form_rows in rows.items() if form_rows]
+    samples['R'] = [(f"R|SVR001|{fid}|{'~'.join(form_rows)}", True) for fid, form_rows in rows.items() if form_rows]
+    forms = []
+    for fid, form_rows in rows.items():
+        field_ids = [field[:2] for field in form_rows[0].split('|')] if form_rows else []
+        lines = [f"desc:{fid} field report"] + [f"{'L' if n % 2 else 'R'}{k},Field {k},{3 + n},{1 if n % 2 else 40},256" for n, k in enumerate(field_ids, 1)]
+        forms.append((f"U|SVR001|{fid}|{'~'.join(lines)}", True))
+    samples['U'] = forms
+    readme = os.path.join(REPO_DIR, 'README.md')
+    if os.path.exists(readme):
+        with open(readme) as f:
+            text = f.read().replace('\n', '~')
+        samples['G'] = [(f"G001/001|SVR001|news|readme|{text[:PACLEN_HINT]}", True)]
+        samples['P'] = [(f"P|CLT001|news|bulletin|{text[:120]}", True)]
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes-on-air per packet type, hex vs binary compression")
+    parser.add_argument('--csv-dir', default=os.path.join(REPO_DIR, 'internal', 'CVS'))
+    parser.add_argument('--baud', type=int, default=1200)
+    parser.add_argument('--paclen', type=int, default=255)
+    args = parser.parse_args()
+
+    failures = 0
+    samples = sample_payloads(args.csv_dir)
+    print(f"{'Type':<5}{'Pkts':>5}{'Before':>9}{'After':>9}{'Saved':>8}{'Air(s) before':>15}{'Air(s) after':>14}")
+    total_before = total_after = 0
+    for ptype, payloads in samples.items():
+        before = after = 0
+        for payload, compress in payloads:
+            before += sum(len(f) for f in frames_before(payload, ptype in LEGACY_COMPRESSED, args.paclen))
+            after += sum(len(f) for f in frames_after(payload, compress, args.paclen))
+            try:
+                check_round_trip(payload, compress, args.paclen)
+            except (AssertionError, zlib.error, UnicodeDecodeError) as e:
+                failures += 1
+                print(f"  round-trip FAILED for {ptype}: {e}")
+        total_before += before
+        total_after += after
+        saved = 100.0 * (before - after) / before if before else 0.0
+        print(f"{ptype:<5}{len(payloads):>5}{before:>9}{after:>9}{saved:>7.1f}%{before * 8 / args.baud:>15.2f}{after * 8 / args.baud:>14.2f}")
+    print(f"{'All':<5}{'':>5}{total_before:>9}{total_after:>9}{100.0 * (total_before - total_after) / max(total_before, 1):>7.1f}%")
+
+    # Escaping stress: random binary info fields are full of C0/DB bytes
+    rng = random.Random(1200)
+    for _ in range(500):
+        info = bytes(rng.choice((0xC0, 0xDB, 0xDC, 0xDD, rng.randrange(256))) for _ in range(rng.randrange(1, 200)))
+        ax25 = ax25_frame("CLT001", "SVR001", info)
+        if kiss_unescape(kiss_escape(ax25)[2:-1]) != ax25:
+            failures += 1
+    print(f"KISS escape round-trip: {'OK' if not failures else f'{failures} failures'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
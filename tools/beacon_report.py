@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# beacon_report.py
+# Version 1.0 - 2025-04-13
+# Beacon airtime per hour before and after server v4.0.20. Before: M|NONE|<32 hex> and M|PUSH|<32 hex> every
+# broadcast_interval, changed or not. After: the '# Beacon Scheduler Functions' section of
+# lib/server/server_v4.0.4.txt, run on a simulated clock: one M|SYNC frame with 12-hex digests, sent when the forms,
+# push items or dictionary change, backing off to beacon_max_interval while they don't, with early beacons for
+# callsigns heard for the first time or back after beacon_silent_after, the M a v5.0.13 client sends when it
+# connects, and the back-off reset after each sync batch.
+# The day: --changes forms edits and --push-changes CMS push items spread over it, --clients callsigns that each come
+# on the air --sessions times (first frame and M request at the start, traffic every few minutes while on), and a
+# sync batch sync_coalesce_window after every change while anyone is on.
+#
+# Usage: python3 tools/beacon_report.py [--hours 24] [--clients 12] [--sessions 3] [--changes 6] [--push-changes 12]
+#                                       [--broadcast-interval 60] [--max-interval 1800] [--baud 1200] [--seed 1]
+# Exits non-zero if a change waited past beacon_check_interval + beacon_min_gap for its beacon, or a newcomer past
+# beacon_min_gap.
+
+import argparse
+import hashlib
+import heapq
+import os
+import random
+import sys
+import threading
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import ax25_frame  # noqa: E402
+from sync_simulator import SERVER_SOURCE, source_section  # noqa: E402
+
+CALLSIGN = 'SVR001'
+SYNC_COALESCE_WINDOW = 3  # Server default
+
+def air_bytes(payload):
+    return len(ax25_frame(CALLSIGN, 'ALL', payload.encode()))
+
+def load_scheduler(args, clock, sent):
+    """The server's beacon scheduler with a settable clock; what it transmits lands in sent as (time, bytes)."""
+    ns = {
+        'threading': threading, 'time': types.SimpleNamespace(time=lambda: clock[0]), 'CALLSIGN': CALLSIGN,
+        'BROADCAST_INTERVAL': args.broadcast_interval, 'BEACON_COMBINED': True, 'BEACON_MAX_INTERVAL': args.max_interval,
+        'BEACON_CHECK_INTERVAL': args.check_interval, 'BEACON_SILENT_AFTER': args.silent_after,
+        'BEACON_MIN_GAP': args.min_gap, 'CMS_SYNC_ENABLED': True, 'TX_BEACON': 3, 'LOG_BROADCAST_STATE': False,
+        'log_event': lambda *a, **k: None,
+        'transmit': lambda dest, payload, priority, key=None, ttl=None: sent.append((clock[0], air_bytes(payload))) or air_bytes(payload),
+    }
+    exec(compile(source_section(SERVER_SOURCE, '# Beacon Scheduler Functions', 'def broadcast_forms_md5('), SERVER_SOURCE, 'exec'), ns)
+    return ns
+
+def make_day(args, rng):
+    """Sorted (time, kind, detail) events for the simulated run."""
+    span = args.hours * 3600
+    events = [(rng.uniform(0, span), 'forms', n) for n in range(args.changes)]
+    events += [(rng.uniform(0, span), 'push', n) for n in range(args.push_changes)]
+    for n in range(args.clients):
+        callsign = f"CLT{n + 1:03d}"
+        for start in sorted(rng.uniform(0, span) for _ in range(args.sessions)):
+            length = rng.uniform(10, 90) * 60
+            events.append((start, 'connect', callsign))
+            t = start + rng.uniform(60, 300)
+            while t < start + length:
+                events.append((t, 'traffic', callsign))
+                t += rng.uniform(60, 300)
+    return sorted(events)
+
+def digest(name, generation):
+    return hashlib.md5(f"{name}{generation}".encode()).hexdigest()
+
+def simulate(args, events):
+    """Runs broadcast_forms_md5()'s loop against the events. Returns (beacon sends, beacon_metrics, late changes, late newcomers)."""
+    clock, sent = [0.0], []
+    ns = load_scheduler(args, clock, sent)
+    generations = {'forms': 0, 'push': 0}
+    heard, online = {}, {}
+    waiting_change, waiting_newcomer = [], []
+    late_changes, late_newcomers = [], []
+    queue = list(events)
+    heapq.heapify(queue)
+    span = args.hours * 3600
+    next_check = 0.0
+    while clock[0] < span:
+        if queue and queue[0][0] <= next_check:
+            clock[0], kind, detail = heapq.heappop(queue)
+            if kind in ('forms', 'push'):
+                generations[kind] += 1
+                waiting_change.append(clock[0])
+                if any(until > clock[0] for until in online.values()):
+                    heapq.heappush(queue, (clock[0] + args.check_interval + SYNC_COALESCE_WINDOW, 'sync', kind))
+            elif kind == 'sync':
+                ns['request_beacon']('sync', reset=True)
+            else:
+                last = heard.get(detail)
+                if last is None or clock[0] - last > args.silent_after:  # handle_kiss_frame()
+                    ns['request_beacon']('new callsign' if last is None else 'callsign back')
+                    waiting_newcomer.append(clock[0])
+                if kind == 'connect':
+                    ns['request_beacon']('asked')  # The M|SYNC| terminal_client v5.0.13 sends on connect
+                    online[detail] = clock[0] + 90 * 60
+                heard[detail] = clock[0]
+            if ns['beacon_wakeup'].is_set():
+                ns['beacon_wakeup'].clear()
+                next_check = clock[0]
+            continue
+        clock[0] = next_check
+        digests = (digest('forms', generations['forms']), digest('push', generations['push']), 1)
+        reason, wait = ns['beacon_due'](clock[0], digests)
+        if reason:
+            ns['send_beacon'](clock[0], reason, digests)
+            late_changes += [clock[0] - t for t in waiting_change if clock[0] - t > args.check_interval + args.min_gap + 1e-9]
+            late_newcomers += [clock[0] - t for t in waiting_newcomer if clock[0] - t > args.min_gap + 1e-9]
+            waiting_change, waiting_newcomer = [], []
+            wait = args.check_interval
+        next_check = clock[0] + wait
+    return sent, ns['beacon_metrics'], late_changes, late_newcomers
+
+def old_schedule(args):
+    """v4.0.19: both full digests every broadcast_interval."""
+    forms = air_bytes(f"M|{CALLSIGN}|NONE|{digest('forms', 0)}|Z1")
+    push = air_bytes(f"M|{CALLSIGN}|PUSH|{digest('push', 0)}")
+    return [(t, size) for t in range(0, args.hours * 3600, args.broadcast_interval) for size in (forms, push)]
+
+def per_hour(sends, hours):
+    frames, sizes = [0] * hours, [0] * hours
+    for t, size in sends:
+        hour = min(int(t // 3600), hours - 1)
+        frames[hour] += 1
+        sizes[hour] += size
+    return frames, sizes
+
+def main():
+    parser = argparse.ArgumentParser(description="Beacon airtime per hour, fixed pair vs the adaptive M|SYNC beacon")
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--clients', type=int, default=12)
+    parser.add_argument('--sessions', type=int, default=3, help="Times each client comes on the air")
+    parser.add_argument('--changes', type=int, default=6, help="Forms edits over the run")
+    parser.add_argument('--push-changes', type=int, default=12, help="CMS push items posted or expired over the run")
+    parser.add_argument('--broadcast-interval', type=int, default=60)
+    parser.add_argument('--max-interval', type=int, default=1800, help="beacon_max_interval")
+    parser.add_argument('--check-interval', type=float, default=5, help="beacon_check_interval")
+    parser.add_argument('--silent-after', type=int, default=900, help="beacon_silent_after")
+    parser.add_argument('--min-gap', type=float, default=10, help="beacon_min_gap")
+    parser.add_argument('--baud', type=int, default=1200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    events = make_day(args, random.Random(args.seed))
+    new, metrics, late_changes, late_newcomers = simulate(args, events)
+    old = old_schedule(args)
+    old_frames, old_bytes = per_hour(old, args.hours)
+    new_frames, new_bytes = per_hour(new, args.hours)
+    activity = per_hour([(t, 0) for t, kind, _ in events if kind in ('forms', 'push', 'connect')], args.hours)[0]
+
+    print(f"{'hour':>4} {'events':>6} {'old frames':>10} {'old bytes':>9} {'old air s':>9} {'new frames':>10} {'new bytes':>9} {'new air s':>9}")
+    for hour in range(args.hours):
+        print(f"{hour:>4} {activity[hour]:>6} {old_frames[hour]:>10} {old_bytes[hour]:>9} {old_bytes[hour] * 8 / args.baud:>9.1f} "
+              f"{new_frames[hour]:>10} {new_bytes[hour]:>9} {new_bytes[hour] * 8 / args.baud:>9.1f}")
+    old_total, new_total = sum(old_bytes), sum(new_bytes)
+    print(f"total: {len(old)} -> {len(new)} frames, {old_total} -> {new_total} bytes, "
+          f"{old_total * 8 / args.baud:.0f} -> {new_total * 8 / args.baud:.0f} s at {args.baud} baud "
+          f"({100 * (1 - new_total / max(old_total, 1)):.1f}% less)")
+    print(f"  beacons: {metrics['changed']} after a change, {metrics['early']} early (newcomers, requests), "
+          f"{metrics['beacons'] - metrics['changed'] - metrics['early']} scheduled")
+    failures = 0
+    if late_changes:
+        print(f"  {len(late_changes)} changes beaconed late, worst {max(late_changes):.1f} s")
+        failures += 1
+    if late_newcomers:
+        print(f"  {len(late_newcomers)} newcomers waited past beacon_min_gap, worst {max(late_newcomers):.1f} s")
+        failures += 1
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
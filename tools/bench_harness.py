@@ -0,0 +1,855 @@
+#!/usr/bin/env python3
+# bench_harness.py
+# Version 1.6 - 2025-04-13 - Loads metrics.py for server v4.0.24 and Fake Direwolf v1.11, the server's counters in the results
+# Version 1.5 - 2025-04-13 - G chunks carry the item version (server v4.0.23), cms asks again for the last chunk by range
+# Version 1.4 - 2025-04-13 - V (DELTA) updates (server v4.0.22) applied like terminal_client v5.0.15, edit_sync scenario
+# Version 1.3 - 2025-04-13 - Payloads that compress into one frame go unsplit, like terminal_client v5.0.14
+# Version 1.2 - 2025-04-13 - Combined M|SYNC beacons (server v4.0.20), clients ask for a beacon when they connect
+# Version 1.1 - 2025-04-11 - --capture keeps the server's KISS capture (server v4.0.16) for tools/kiss_replay.py
+# Version 1.0 - 2025-04-10
+# End-to-end benchmark: the server core and Fake Direwolf run headless (no curses) in their own processes and
+# dozens of simulated clients talk to them over KISS. The simulated clients run the terminal client's own code
+# for the info field codec, reassembly/NACKs, the forms index and the digest tree walk, exec'd from its source,
+# so M/H/X/U/D sync, I/S/N searches and P/G CMS traffic is the real protocol, only without the screens.
+#   cold_sync   - clients start with no forms, time until each one's forms digest matches the server
+#   submit      - I (INSERT) round trip to the A (ACK), every fourth one multi-part
+#   search      - S (SEARCH) round trip to the first R page, plus an N (NEXT) for the second page if any
+#   cms         - P (POST) round trip to its A, then G (GET) back until every chunk is in and matches, then a
+#                 G for just the last chunk by range (server v4.0.23), which must bring only that chunk
+#   change_sync - --changes forms edited, added or deleted on the server, time until every client converges
+#   edit_sync   - one field relabelled in --changes forms, sent as V (DELTA) line edits by server v4.0.22
+# A passive listener hears every frame for bytes on air per function. Server CPU and RSS come from /proc. Each
+# scenario runs until the air has been quiet (beacons aside) for --settle seconds, so replies queued at the server's
+# tx_baud count toward the scenario that asked for them.
+# Results go to --output as JSON; --baseline compares against an earlier run's JSON. Point --server-source and
+# friends at an older version (git show <rev>:lib/server/server_v4.0.4.txt) to compare versions. Needs server
+# v4.0.14 or later (server_core) and Fake Direwolf v1.07 or later (relay_core).
+#
+# Usage: python3 tools/bench_harness.py [--clients 24] [--forms 20] [--changes 6] [--tx-baud 1200]
+#                                       [--scenarios cold_sync submit search cms change_sync edit_sync] [--channel]
+#                                       [--output bench_results.json] [--baseline old.json] [--tolerance 0.2]
+#                                       [--capture bench.kiss]
+# Exits non-zero if a client doesn't converge, a reply is lost or wrong, or a metric regressed past --tolerance.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import selectors
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, ax25_frame, kiss_escape, kiss_unescape, load_codec, load_metrics  # noqa: E402
+from sync_simulator import function_source, source_section  # noqa: E402
+
+SERVER_SOURCE = os.path.join(REPO_DIR, 'lib', 'server', 'server_v4.0.4.txt')
+CLIENT_SOURCE = os.path.join(REPO_DIR, 'lib', 'client', 'terminal_client_v5.0.1.txt')
+DIREWOLF_SOURCE = os.path.join(REPO_DIR, 'lib', 'direwolf', 'Fake_Direwolf_v1.05.txt')
+SERVER_CALLSIGN = 'SVR001'
+BENCH_FORM = 'BENCH01'  # Submissions and searches go to the first seeded form
+CMS_CATEGORY = 'bench'
+CMS_CHUNK = re.compile(r'G\d{3}/\d{3}')
+SCENARIOS = ('cold_sync', 'submit', 'search', 'cms', 'change_sync', 'edit_sync')
+REPLY_FUNCTIONS = ('A', 'R', 'G')
+# (scenario, metric path) compared against --baseline, higher is worse for all of them
+REGRESSION_METRICS = [
+    ('cold_sync', ('convergence_s', 'max')), ('change_sync', ('convergence_s', 'max')), ('edit_sync', ('convergence_s', 'max')),
+    ('submit', ('rtt_ms', 'p95')), ('search', ('rtt_ms', 'p95')), ('cms', ('post_rtt_ms', 'p95')), ('cms', ('get_rtt_ms', 'p95')),
+] + [(name, path) for name in SCENARIOS for path in (('air', 'bytes'), ('server', 'cpu_s'), ('server', 'rss_peak_kb'))]
+
+# Headless server and Fake Direwolf, run as `bench_harness.py --role server|direwolf` by the harness
+
+def wait_for_term():
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: done.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: done.set())
+    while not done.wait(0.5):
+        pass
+
+def run_server(args):
+    """main() without curses: same directories, startup calls and threads, then waits for SIGTERM."""
+    load_codec()  # server.py imports ax25_codec from beside it
+    load_metrics()  # And metrics, v4.0.24
+    ns = {'__name__': 'bench_server', '__file__': args.source}
+    with open(args.source) as f:
+        exec(compile(f.read(), args.source, 'exec'), ns)
+    ns['FAKE_DIREWOLF_HOST'] = '127.0.0.1'
+    ns['FAKE_DIREWOLF_PORT'] = args.kiss_port
+    ns['BROADCAST_INTERVAL'] = args.beacon_interval
+    if 'beacon_state' in ns:  # Server v4.0.20 backs off from broadcast_interval
+        ns['beacon_state']['interval'] = args.beacon_interval
+    if args.tx_baud is not None:
+        ns['TX_BAUD'] = args.tx_baud
+    if args.capture:
+        ns['CAPTURE_FILE'] = args.capture
+    for path in (ns['DATA_DIR'], ns['FORMS_DIR'], ns['CMS_DIR']):
+        os.makedirs(path, exist_ok=True)
+    ns['init_people_csv']()
+    ns['load_hash_cache']()
+    stop_event = threading.Event()
+    targets = [ns['broadcast_forms_md5'], ns['server_core']]
+    if ns['INDEX_INOTIFY']:
+        targets.insert(0, ns['watch_index_dirs'])
+    threads = [threading.Thread(target=target, args=(stop_event,), daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    if 'start_metrics' in ns:  # Server v4.0.24: endpoint at ~/terminal/server_data/metrics.sock, read per scenario
+        ns['start_metrics']()
+    wait_for_term()
+    stop_event.set()
+    ns['wake_core']()
+    threads[-1].join(2)
+    ns['save_submission_indexes']()
+    ns['stop_log_writer']()
+    return 0
+
+def run_direwolf(args):
+    """Fake Direwolf's relay core (and channel model) without the status screen or LAN peer threads."""
+    load_codec()
+    load_metrics()
+    argv = sys.argv
+    sys.argv = [args.source, args.config]
+    try:
+        ns = {'__name__': 'bench_direwolf'}
+        with open(args.source) as f:
+            exec(compile(f.read(), args.source, 'exec'), ns)
+    finally:
+        sys.argv = argv
+    threading.Thread(target=ns['relay_core'], daemon=True).start()
+    if ns['CHANNEL_MODEL']:
+        threading.Thread(target=ns['channel_loop'], daemon=True).start()
+    wait_for_term()
+    ns['stop_event'].set()
+    return 0
+
+# Simulated clients
+
+def settings_defaults(source):
+    """The client's Chunk 1 constants and config fallbacks, as it runs with no terminal_client.conf."""
+    fallback = lambda section, option, fallback=None: fallback  # noqa: E731
+    ns = {'config': types.SimpleNamespace(get=fallback, getint=fallback, getfloat=fallback, getboolean=fallback)}
+    for line in source_section(source, '# Chunk 1', '# Chunk 2').splitlines():
+        if re.match(r'[A-Z][A-Z0-9_]* = ', line):
+            try:
+                exec(line, ns)
+            except Exception:
+                pass  # Paths, imports and multi-line settings; the harness sets what it needs below
+    return {name: value for name, value in ns.items() if re.fullmatch(r'[A-Z][A-Z0-9_]*', name)}
+
+def function_only(source, name):
+    """function_source() up to the function's last line, without the module code that may follow it."""
+    lines = function_source(source, name).splitlines()
+    end = next((n for n, line in enumerate(lines[1:], 1) if line and not line[0].isspace()), len(lines))
+    return '\n'.join(lines[:end]) + '\n'
+
+def load_client_code(source, install_dir, callsign, send, defaults):
+    """One client's namespace: codec, reassembly, file index and sync walk functions from the client source."""
+    code = ''.join(function_only(source, name) for name in ('encode_info_field', 'decode_info_field', 'load_zdict', 'build_forms_index'))
+    code += source_section(source, '# Reassembly Functions', '# File Index Functions')
+    code += source_section(source, '# File Index Functions', '# Sync Walk Functions')
+    code += source_section(source, '# Sync Walk Functions', '# CMS Functions')
+    ns = dict(defaults)
+    ns.update({name: False for name in set(re.findall(r'\b(LOG_[A-Z0-9_]+)\b', code))})
+    ns.update({
+        'os': os, 're': re, 'json': json, 'time': time, 'zlib': zlib, 'hashlib': hashlib, 'OrderedDict': OrderedDict,
+        'log_event': lambda *a, **k: None, 'send_to_kiss': lambda stdscr, packet: send(packet),
+        'CALLSIGN': callsign, 'INSTALL_DIR': install_dir, 'FORMS_DIR': os.path.join(install_dir, 'forms'),
+        'hash_cache': None, 'hash_cache_lock': threading.Lock(), 'zdict_bytes': None, 'zdict_version': 0,
+        'server_zdict_version': 0, 'sync_walks': {}, 'parts_lock': threading.Lock(), 'completed_parts': {},
+        'sent_parts': OrderedDict(), 'message_seq': int.from_bytes(os.urandom(2), 'big'),
+    })
+    os.makedirs(ns['FORMS_DIR'], exist_ok=True)
+    exec(compile(code, source, 'exec'), ns)
+    return ns
+
+def callsign_text(address):
+    return ''.join(chr(b >> 1) for b in address[:6]).strip()
+
+def write_form_update(ns, form_id, content):
+    """Write a U (FORM_UPDATE) like kiss_listener() does, so the file and its MD5 come out the same."""
+    path = os.path.join(ns['FORMS_DIR'], f"{form_id}.txt")
+    ns['delta_failed'].discard(form_id)
+    text = content.replace('~', '\n').rstrip() + '\n'
+    if form_id != ns['ZDICT_FORM_ID']:
+        lines = []
+        for line in text.split('\n'):
+            if ',' in line and len(line.split(',')) == 5:
+                fid, label, row, col, length = line.split(',')
+                line = f"{fid},{label},{row},{col},{re.sub(r'[^0-9]', '', length) or '256'}"
+            lines.append(line)
+        text = '\n'.join(lines)
+    with open(path, 'w', newline='\n') as f:
+        f.write(text)
+    if form_id == ns['ZDICT_FORM_ID']:
+        ns['load_zdict']()
+
+class SimClient:
+    """A terminal client without curses: what kiss_listener() and the main loop do with each packet."""
+
+    def __init__(self, callsign, workdir, defaults, passive=False):
+        self.callsign = callsign
+        self.passive = passive  # Listens only: counts every frame on the air, never transmits
+        self.ns = load_client_code(CLIENT_SOURCE, os.path.join(workdir, callsign), callsign, self.send, defaults)
+        self.sock = None
+        self.send_lock = threading.Lock()
+        self.buffer = b""
+        self.form_parts, self.cms_parts = {}, {}
+        self.syncing, self.sync_started = False, 0
+        self.digest = self.ns['build_forms_index']()
+        self.replies, self.reply_cond = [], threading.Condition()
+        self.frames = []  # Passive only: (time, function, air bytes)
+        self.beacons = []  # Passive only: (time, forms digest)
+
+    def connect(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send(f"M|{self.callsign}|SYNC|")  # Like terminal_client v5.0.13 on connect, older servers ignore it
+
+    def send(self, payload):
+        """send_to_kiss() and build_ax25_packet(): split past PACLEN - 32 unless it compresses into one frame, parts
+        kept for NACKs, compressed if smaller."""
+        if self.passive:
+            return
+        max_payload = self.ns['PACLEN'] - 32
+        parts = [payload]
+        if len(payload) > max_payload and len(self.ns['encode_info_field'](payload, True)) > max_payload:
+            mid, parts = self.ns['split_message'](payload, max_payload)
+            self.ns['remember_parts'](mid, SERVER_CALLSIGN, parts, True)
+        self.send_parts(parts)
+
+    def send_parts(self, parts):
+        frames = b''.join(kiss_escape(ax25_frame(self.callsign, SERVER_CALLSIGN, self.ns['encode_info_field'](part, True))) for part in parts)
+        with self.send_lock:
+            self.sock.sendall(frames)
+
+    def receive(self, data):
+        self.buffer += data
+        while b'\xC0' in self.buffer[1:]:
+            start = self.buffer.find(b'\xC0')
+            end = self.buffer.find(b'\xC0', start + 1)
+            if end == -1:
+                break
+            frame = self.buffer[start:end + 1]
+            self.buffer = self.buffer[end + 1:]
+            if len(frame) > 2:
+                self.handle_frame(kiss_unescape(frame[2:-1]))
+
+    def handle_frame(self, ax25_packet):
+        if len(ax25_packet) < 20:
+            return
+        now = time.time()
+        dest = callsign_text(ax25_packet[1:8])
+        payload = self.ns['decode_info_field'](ax25_packet[17:-3])
+        parts = payload.split('|', 3)
+        if self.passive:
+            self.frames.append((now, parts[0][:1] if len(parts) == 4 else '?', len(ax25_packet)))
+        if len(parts) != 4:
+            return
+        function, _, form_id, content = parts
+        if self.ns['PART_TAG'].match(content) and (function in ['U', 'R', 'G', 'L', 'H', 'V'] or CMS_CHUNK.fullmatch(function)):
+            content = self.ns['add_message_part'](self.form_parts if function in ['U', 'R', 'V'] else self.cms_parts, function, parts[1], form_id, content)
+            if content is None:
+                return
+        if function == 'M':
+            # The combined M|SYNC beacon of server v4.0.20 is split into its NONE and PUSH parts like the client does
+            beacons = self.ns['split_sync_beacon'](parts[1], content) if form_id == 'SYNC' else [(function, parts[1], form_id, content)]
+            for _, _, beacon_form_id, beacon in beacons:
+                self.handle_beacon(now, beacon_form_id, beacon)
+        elif function == 'U' and not form_id.startswith('push/'):
+            write_form_update(self.ns, form_id, content)
+            self.digest = self.ns['build_forms_index']()
+            self.syncing = False
+        elif function == 'V' and not form_id.startswith('push/'):
+            if self.ns['apply_delta_update'](form_id, content) and form_id == self.ns['ZDICT_FORM_ID']:
+                self.ns['load_zdict']()
+            self.digest = self.ns['build_forms_index']()
+            self.syncing = False
+        elif function == 'D' and not form_id.startswith('push/'):
+            path = os.path.join(self.ns['FORMS_DIR'], f"{form_id}.txt")
+            if os.path.exists(path):
+                os.remove(path)
+            if form_id == self.ns['ZDICT_FORM_ID']:
+                self.ns['load_zdict']()
+            self.digest = self.ns['build_forms_index']()
+            self.syncing = False
+        elif function == 'H':
+            self.ns['handle_sync_digests'](None, form_id, content)
+        elif function == 'K' and dest == self.callsign:
+            mid, seqs = self.ns['parse_nack'](content)
+            self.send_parts(self.ns['resend_parts'](mid, seqs)[2])
+        elif function[:1] in REPLY_FUNCTIONS and dest == self.callsign:
+            with self.reply_cond:
+                self.replies.append((now, function, form_id, content))
+                self.reply_cond.notify_all()
+
+    def handle_beacon(self, now, form_id, content):
+        if form_id == 'PUSH':  # Push sync isn't benchmarked, the harness never posts to push/
+            return
+        server_hash, *extras = content.strip().split('|')
+        for extra in extras:
+            if extra.startswith('Z') and extra[1:].isdigit():
+                self.ns['server_zdict_version'] = int(extra[1:])
+        if self.passive:
+            self.beacons.append((now, server_hash))
+        elif not self.syncing or now - self.sync_started > self.ns['SYNC_TIMEOUT']:
+            self.digest = self.ns['build_forms_index']()
+            if not server_hash or not self.digest.startswith(server_hash):  # Combined beacons carry a prefix
+                self.syncing, self.sync_started = True, now
+                if self.ns['TREE_SYNC']:
+                    self.ns['start_sync_walk'](None, form_id)
+                else:
+                    entries = self.ns['load_sync_entries'](form_id)
+                    self.send(f"X|{self.callsign}|{form_id}|" + '|'.join(f"{name}:{md5}" for name, md5 in entries.items()))
+
+    def sweep(self):
+        for parts in (self.form_parts, self.cms_parts):
+            for _, form_id, nack in self.ns['sweep_message_parts'](parts):
+                self.send(f"K|{self.callsign}|{form_id}|{nack}")
+
+    def request(self, payload, done, timeout):
+        """Send payload and wait until done(replies since) is true; returns the seconds taken, None on timeout."""
+        with self.reply_cond:
+            first = len(self.replies)
+        sent = time.time()
+        self.send(payload)
+        deadline = sent + timeout
+        with self.reply_cond:
+            while not done(self.replies[first:]):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.reply_cond.wait(remaining)
+            return self.replies[-1][0] - sent
+
+def client_loop(clients, stop):
+    """Every client's socket in one selector; expired partial messages are swept and NACKed between reads."""
+    selector = selectors.DefaultSelector()
+    for client in clients:
+        selector.register(client.sock, selectors.EVENT_READ, client)
+    last_sweep = 0
+    while not stop.is_set():
+        for key, _ in selector.select(0.25):
+            data = key.fileobj.recv(65536)
+            if not data:
+                selector.unregister(key.fileobj)
+                continue
+            key.data.receive(data)
+        if time.time() - last_sweep >= 0.25:
+            last_sweep = time.time()
+            for client in clients:
+                client.sweep()
+    selector.close()
+
+# Server side: forms, process stats and air accounting
+
+def form_text(n, revision):
+    fields = ''.join(f"L{f:02d},Field {f} r{revision},{2 + f},2,256\nR{f:02d},Value {f},{2 + f},30,256\n" for f in range(1, 2 + (n + revision) % 5))
+    return f"desc:Benchmark form {n} revision {revision}\n{fields}"
+
+def write_form(forms_dir, n, revision):
+    with open(os.path.join(forms_dir, f"BENCH{n:02d}.txt"), 'w', newline='\n') as f:
+        f.write(form_text(n, revision))
+
+def change_forms(forms_dir, count, rng):
+    """Edit, add and delete forms in turn (never BENCH01, the submissions go there); returns what changed."""
+    names = sorted(name[:-4] for name in os.listdir(forms_dir) if re.fullmatch(r'BENCH\d+\.txt', name) and name != f"{BENCH_FORM}.txt")
+    changed = {'edited': 0, 'added': 0, 'deleted': 0}
+    next_new = max(int(name[5:]) for name in names + [BENCH_FORM]) + 1
+    for n, name in enumerate(rng.sample(names, min(count, len(names)))):
+        if n % 3 == 0:
+            write_form(forms_dir, int(name[5:]), rng.randrange(1, 1000))
+            changed['edited'] += 1
+        elif n % 3 == 1:
+            write_form(forms_dir, next_new, 0)
+            next_new += 1
+            changed['added'] += 1
+        else:
+            os.remove(os.path.join(forms_dir, f"{name}.txt"))
+            changed['deleted'] += 1
+    return changed
+
+def edit_forms(forms_dir, count, rng):
+    """Relabel one field in each of count forms (never BENCH01), the small edit V (DELTA) is for; returns the count."""
+    names = sorted(name for name in os.listdir(forms_dir) if re.fullmatch(r'BENCH\d+\.txt', name) and name != f"{BENCH_FORM}.txt")
+    for name in rng.sample(names, min(count, len(names))):
+        path = os.path.join(forms_dir, name)
+        with open(path) as f:
+            lines = f.read().split('\n')
+        n = rng.choice([n for n, line in enumerate(lines) if line.count(',') == 4])
+        fields = lines[n].split(',')
+        fields[1] += f" e{rng.randrange(1000)}"
+        lines[n] = ','.join(fields)
+        with open(path, 'w', newline='\n') as f:
+            f.write('\n'.join(lines))
+    return min(count, len(names))
+
+def forms_digest(ns, forms_dir):
+    entries = {}
+    for name in os.listdir(forms_dir):
+        if name.endswith('.txt'):
+            with open(os.path.join(forms_dir, name), 'rb') as f:
+                entries[name[:-4]] = hashlib.md5(f.read()).hexdigest()
+    return ns['collection_digest'](entries)
+
+def process_stats(pid):
+    """(CPU seconds, RSS kB) of a process from /proc, None where /proc isn't there."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        return cpu, rss
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None
+
+def sample_server(pid, samples, stop):
+    while not stop.wait(0.2):
+        stats = process_stats(pid)
+        if stats:
+            samples.append((time.time(),) + stats)
+
+def percentiles(values, scale=1.0):
+    if not values:
+        return {'count': 0}
+    values = sorted(v * scale for v in values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p))]  # noqa: E731
+    return {'count': len(values), 'min': round(values[0], 3), 'p50': round(pick(0.5), 3), 'p90': round(pick(0.9), 3),
+            'p95': round(pick(0.95), 3), 'p99': round(pick(0.99), 3), 'max': round(values[-1], 3)}
+
+def window_report(start, end, listener, samples, pid, cpu_start, baud):
+    air = {'frames': 0, 'bytes': 0, 'by_function': {}}
+    for when, function, size in list(listener.frames):
+        if start <= when <= end:
+            air['frames'] += 1
+            air['bytes'] += size
+            entry = air['by_function'].setdefault(function, {'frames': 0, 'bytes': 0})
+            entry['frames'] += 1
+            entry['bytes'] += size
+    air['airtime_s'] = round(air['bytes'] * 8 / baud, 2)
+    server = {}
+    stats = process_stats(pid)
+    if stats and cpu_start is not None:
+        rss = [s[2] for s in samples if start <= s[0] <= end] + [stats[1]]
+        server = {'cpu_s': round(stats[0] - cpu_start, 3), 'cpu_pct': round(100 * (stats[0] - cpu_start) / max(end - start, 1e-6), 1),
+                  'rss_kb': stats[1], 'rss_peak_kb': max(rss)}
+    return {'duration_s': round(end - start, 2), 'air': air, 'server': server}
+
+# Scenarios
+
+def wait_quiet(listener, quiet, timeout):
+    """Until the listener has heard nothing but beacons for quiet seconds, so replies still queued at the server's
+    tx_baud count toward the scenario that caused them, not the next one. Returns the last frame's time, None if
+    the air never went quiet."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        last = max([when for when, function, _ in list(listener.frames) if function != 'M'] or [0])
+        if time.time() - last >= quiet:
+            return last
+        time.sleep(0.2)
+    return None
+
+def run_clients(clients, work):
+    """Run work(client, rng) for every client at once, each in its own thread."""
+    threads = [threading.Thread(target=work, args=(client, random.Random(n)), daemon=True) for n, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def wait_converged(clients, listener, forms_dir, start, timeout):
+    """Seconds from start until each client's forms digest matched the server's, None for those that never did."""
+    converged = {}
+    deadline = start + timeout
+    while time.time() < deadline and len(converged) < len(clients):
+        target = forms_digest(listener.ns, forms_dir)
+        for client in clients:
+            if client.callsign not in converged and client.digest == target:
+                converged[client.callsign] = time.time() - start
+        time.sleep(0.1)
+    return [converged.get(client.callsign) for client in clients]
+
+def sync_result(times, listener, forms_dir, start):
+    target = forms_digest(listener.ns, forms_dir)
+    beacon = next((when for when, digest in list(listener.beacons) if when >= start and digest and target.startswith(digest)), None)
+    done = [t for t in times if t is not None]
+    result = {'clients': len(times), 'converged': len(done), 'convergence_s': percentiles(done)}
+    if beacon is not None:
+        result['first_beacon_s'] = round(beacon - start, 2)  # Sync can't start before a beacon carries the new digest
+        result['after_beacon_s'] = percentiles([t - (beacon - start) for t in done])
+    return result, len(done) < len(times)
+
+def scenario_cold_sync(clients, listener, args, forms_dir):
+    start = time.time()
+    times = wait_converged(clients, listener, forms_dir, start, args.timeout)
+    return sync_result(times, listener, forms_dir, start)
+
+def scenario_change_sync(clients, listener, args, forms_dir):
+    start = time.time()
+    changed = change_forms(forms_dir, args.changes, random.Random(args.seed))
+    times = wait_converged(clients, listener, forms_dir, start, args.timeout)
+    result, failed = sync_result(times, listener, forms_dir, start)
+    result['changed'] = changed
+    return result, failed
+
+def scenario_edit_sync(clients, listener, args, forms_dir):
+    start = time.time()
+    edited = edit_forms(forms_dir, args.changes, random.Random(args.seed + 1))
+    times = wait_converged(clients, listener, forms_dir, start, args.timeout)
+    result, failed = sync_result(times, listener, forms_dir, start)
+    result['edited'] = edited
+    return result, failed
+
+def scenario_submit(clients, listener, args, forms_dir):
+    rtts, lost = [], []
+
+    def work(client, rng):
+        for n in range(args.submissions):
+            time.sleep(rng.uniform(0, 2 * args.gap))
+            payload = f"I|{client.callsign}|{BENCH_FORM}|L01={client.callsign}|L02=Bench note {n}"
+            if n % 4 == 3:
+                payload += "|L03=" + ' '.join(f"word{rng.randrange(1000)}" for _ in range(60))  # Over one frame
+            rtt = client.request(payload, lambda replies: any(r[1] == 'A' and r[2] == BENCH_FORM for r in replies), args.reply_timeout)
+            if rtt is None:
+                lost.append(n)
+            else:
+                rtts.append(rtt)
+    run_clients(clients, work)
+    return {'sent': len(rtts) + len(lost), 'lost': len(lost), 'rtt_ms': percentiles(rtts, 1000)}, bool(lost)
+
+def scenario_search(clients, listener, args, forms_dir):
+    rtts, next_rtts, rows, lost = [], [], [], []
+
+    def work(client, rng):
+        for n in range(args.searches):
+            time.sleep(rng.uniform(0, 2 * args.gap))
+            first = lambda replies: any(r[1] == 'R' and r[2] == BENCH_FORM for r in replies)  # noqa: E731
+            payload = f"S|{client.callsign}|{BENCH_FORM}|L01={client.callsign}|_page={args.page_size}|_sort=new"
+            rtt = client.request(payload, first, args.reply_timeout)
+            if rtt is None:
+                lost.append(n)
+                continue
+            rtts.append(rtt)
+            header = client.replies[-1][3].split('~', 1)[0]
+            total, _, cursor = header[1:].split(',', 2)
+            rows.append(int(total))
+            if cursor:
+                rtt = client.request(f"N|{client.callsign}|{BENCH_FORM}|{cursor}", first, args.reply_timeout)
+                if rtt is None:
+                    lost.append(n)
+                else:
+                    next_rtts.append(rtt)
+    run_clients(clients, work)
+    return {'sent': len(rtts) + len(next_rtts) + len(lost), 'lost': len(lost), 'rtt_ms': percentiles(rtts, 1000),
+            'next_rtt_ms': percentiles(next_rtts, 1000), 'rows_matched': percentiles(rows)}, bool(lost)
+
+def cms_chunk(content):
+    """(item, version, text) of a G chunk's content, version '' from servers before v4.0.23."""
+    item, _, rest = content.partition('|')
+    version, separator, text = rest.partition('|')
+    if separator and re.fullmatch(r'[0-9a-f]{12}', version):
+        return item, version, text
+    return item, '', rest
+
+def scenario_cms(clients, listener, args, forms_dir):
+    post_rtts, get_rtts, resume_rtts, lost, wrong = [], [], [], [], []
+
+    def work(client, rng):
+        for n in range(args.cms_items):
+            time.sleep(rng.uniform(0, 2 * args.gap))
+            item = f"{client.callsign}-{n}"
+            content = f"Bulletin {item}: " + ' '.join(f"item{rng.randrange(10000)}" for _ in range(args.cms_size // 9))
+            content = content[:args.cms_size]
+            rtt = client.request(f"P|{client.callsign}|CMS|{CMS_CATEGORY}|{item}|{content}",
+                                 lambda replies: any(r[1] == 'A' and r[3].startswith(item + '|') for r in replies), args.reply_timeout)
+            if rtt is None:
+                lost.append(item)
+                continue
+            post_rtts.append(rtt)
+
+            def ours(replies):
+                return [r for r in replies if CMS_CHUNK.fullmatch(r[1]) and cms_chunk(r[3])[0] == item]
+
+            def got_all(replies):
+                chunks = ours(replies)
+                return bool(chunks) and len({r[1] for r in chunks}) == int(chunks[0][1].split('/')[1])
+            rtt = client.request(f"G|{client.callsign}|{CMS_CATEGORY}|{item}", got_all, args.reply_timeout)
+            if rtt is None:
+                lost.append(item)
+                continue
+            get_rtts.append(rtt)
+            with client.reply_cond:
+                chunks = {r[1]: cms_chunk(r[3]) for r in ours(client.replies)}
+            if ''.join(chunks[name][2] for name in sorted(chunks)) != content:
+                wrong.append(item)
+            last = max(chunks)
+            version = chunks[last][1]
+            if not version:
+                continue
+            first = len(client.replies)
+            rtt = client.request(f"G|{client.callsign}|{CMS_CATEGORY}|{item}|{int(last[1:4])}@{version}",
+                                 lambda replies: bool(ours(replies)), args.reply_timeout)
+            if rtt is None:
+                lost.append(item)
+                continue
+            resume_rtts.append(rtt)
+            time.sleep(args.settle)  # Chunks past the one asked for would follow it straight away
+            with client.reply_cond:
+                resent = {r[1] for r in ours(client.replies[first:])}
+            if resent != {last}:
+                wrong.append(item)
+    run_clients(clients, work)
+    return {'sent': 2 * args.cms_items * len(clients) + len(resume_rtts), 'lost': len(lost), 'mismatched': len(wrong),
+            'post_rtt_ms': percentiles(post_rtts, 1000), 'get_rtt_ms': percentiles(get_rtts, 1000),
+            'resume_rtt_ms': percentiles(resume_rtts, 1000)}, bool(lost or wrong)
+
+# Runs and reports
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_port(port, process, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline and process.poll() is None:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def source_version(path):
+    with open(path) as f:
+        match = re.search(r'^VERSION = "([^"]+)"|^# Version (\S+)', f.read(), re.M)
+    return (match[1] or match[2]) if match else None
+
+def git_revision():
+    try:
+        return subprocess.run(['git', '-C', REPO_DIR, 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def start_role(role, args, workdir, extra, env=None):
+    log = open(os.path.join(workdir, f"{role}.out"), 'w')
+    command = [sys.executable, os.path.realpath(__file__), '--role', role] + extra
+    return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=workdir), log
+
+def stop_role(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def metric(report, scenario, path):
+    value = report.get('scenarios', {}).get(scenario, {})
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def compare(report, baseline, tolerance):
+    """Metrics more than tolerance worse than the baseline run, as printable lines."""
+    regressions = []
+    for scenario, path in REGRESSION_METRICS:
+        old, new = metric(baseline, scenario, path), metric(report, scenario, path)
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old > 0 and new > old * (1 + tolerance):
+            regressions.append(f"{scenario} {'.'.join(path)}: {old} -> {new} (+{100 * (new - old) / old:.0f}%)")
+    return regressions
+
+def print_scenario(name, result):
+    line = f"{name}: {result['duration_s']:.1f} s, {result['air']['frames']} frames / {result['air']['bytes']} bytes on air"
+    if result['server']:
+        line += f", server {result['server']['cpu_s']:.2f} s CPU, RSS {result['server']['rss_kb']} kB (peak {result['server']['rss_peak_kb']})"
+    print(line)
+    for key in ('convergence_s', 'after_beacon_s', 'rtt_ms', 'next_rtt_ms', 'post_rtt_ms', 'get_rtt_ms', 'resume_rtt_ms'):
+        stats = result.get(key)
+        if stats and stats['count']:
+            print(f"  {key}: p50 {stats['p50']}, p95 {stats['p95']}, max {stats['max']} ({stats['count']})")
+    for key in ('converged', 'lost', 'mismatched'):
+        if key in result:
+            print(f"  {key}: {result[key]}")
+    if result.get('handler_ms'):
+        print("  handler_ms p50/p99: " + ', '.join(f"{function} {h['p50']:.3g}/{h['p99']:.3g} ({h['count']})" for function, h in result['handler_ms'].items()))
+
+def server_metrics(home):
+    """Server v4.0.24's counters since the last call, zeroed after reading; None from older servers."""
+    try:
+        return load_metrics().fetch(os.path.join(home, 'terminal', 'server_data', 'metrics.sock'), '/metrics/reset')
+    except OSError:
+        return None
+
+def run(args, workdir):
+    home = os.path.join(workdir, 'home')
+    forms_dir = os.path.join(home, 'terminal', 'forms')
+    for path in (forms_dir, os.path.join(home, 'terminal', 'server_data'), os.path.join(home, 'terminal', 'cms')):
+        os.makedirs(path, exist_ok=True)
+    for n in range(1, args.forms + 1):
+        write_form(forms_dir, n, 0)
+    kiss_port = free_port()
+    config = os.path.join(workdir, 'fake_direwolf.conf')
+    with open(DIREWOLF_SOURCE) as f:
+        direwolf_logs = sorted(set(re.findall(r"'(log_\w+)':", f.read())))
+    with open(config, 'w') as f:
+        f.write(f"[Settings]\nkiss_port = {kiss_port}\npeer_port = {free_port()}\nmesh_node_id = bench\n")
+        f.write(f"channel_model = {args.channel}\nchannel_seed = {args.seed}\nrelay_queue_frames = 1024\n")
+        f.writelines(f"{name} = False\n" for name in direwolf_logs)
+    direwolf, direwolf_log = start_role('direwolf', args, workdir, ['--source', DIREWOLF_SOURCE, '--config', config])
+    server = server_log = None
+    stop = threading.Event()
+    try:
+        if not wait_port(kiss_port, direwolf):
+            print(f"Fake Direwolf didn't start, see {direwolf_log.name}")
+            return None, True
+        defaults = settings_defaults(CLIENT_SOURCE)
+        listener = SimClient('BENCH0', workdir, defaults, passive=True)
+        listener.connect(kiss_port)
+        listen_stop = threading.Event()
+        loop = threading.Thread(target=client_loop, args=([listener], listen_stop), daemon=True)
+        loop.start()
+        server_args = ['--source', SERVER_SOURCE, '--kiss-port', str(kiss_port), '--beacon-interval', str(args.beacon_interval)]
+        if args.tx_baud is not None:
+            server_args += ['--tx-baud', str(args.tx_baud)]
+        if args.capture:
+            server_args += ['--capture', os.path.abspath(args.capture)]
+        server, server_log = start_role('server', args, workdir, server_args, env=dict(os.environ, HOME=home))
+        deadline = time.time() + 30
+        while not listener.beacons and time.time() < deadline and server.poll() is None:
+            time.sleep(0.1)
+        if not listener.beacons:
+            print(f"Server never sent a beacon, see {server_log.name}")
+            return None, True
+        samples = []
+        threading.Thread(target=sample_server, args=(server.pid, samples, stop), daemon=True).start()
+        clients = [SimClient(f"BCH{n:03d}", workdir, defaults) for n in range(1, args.clients + 1)]
+        for client in clients:
+            client.connect(kiss_port)
+        listen_stop.set()
+        loop.join(2)
+        threading.Thread(target=client_loop, args=([listener] + clients, stop), daemon=True).start()
+        server_metrics(home)  # Startup and the first beacons don't count toward a scenario
+        report = {
+            'harness': '1.6', 'started': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+            'versions': {'server': source_version(SERVER_SOURCE), 'client': source_version(CLIENT_SOURCE), 'direwolf': source_version(DIREWOLF_SOURCE)},
+            'settings': {key: value for key, value in vars(args).items() if key not in ('role', 'source', 'config', 'kiss_port', 'output', 'baseline', 'keep', 'capture')},
+            'scenarios': {},
+        }
+        failed = False
+        runners = {'cold_sync': scenario_cold_sync, 'submit': scenario_submit, 'search': scenario_search,
+                   'cms': scenario_cms, 'change_sync': scenario_change_sync, 'edit_sync': scenario_edit_sync}
+        for name in args.scenarios:
+            stats = process_stats(server.pid)
+            start = time.time()
+            result, scenario_failed = runners[name](clients, listener, args, forms_dir)
+            end = time.time()
+            last = wait_quiet(listener, args.settle, args.timeout)
+            if last is None:
+                print(f"  Air still busy {args.timeout:.0f} s after {name}")
+                scenario_failed = True
+            end = max(end, last or time.time())
+            result.update(window_report(start, end, listener, samples, server.pid, stats[0] if stats else None, args.baud))
+            snap = server_metrics(home)
+            if snap:
+                result['handler_ms'] = {function: {key: h[key] for key in ('p50', 'p99', 'max', 'count')}
+                                        for function, h in snap['histograms'].get('handler_ms', {}).items()}
+                result['server_metrics'] = {'counters': snap['counters'], 'histograms': snap['histograms']}
+            report['scenarios'][name] = result
+            failed |= scenario_failed
+            print_scenario(name, result)
+        stats = process_stats(server.pid)
+        if stats:
+            report['server'] = {'cpu_s': round(stats[0], 3), 'rss_kb': stats[1], 'rss_peak_kb': max([s[2] for s in samples] + [stats[1]])}
+        return report, failed
+    finally:
+        stop.set()
+        if server:
+            stop_role(server)
+            server_log.close()
+        stop_role(direwolf)
+        direwolf_log.close()
+
+def main():
+    global SERVER_SOURCE, CLIENT_SOURCE, DIREWOLF_SOURCE
+    parser = argparse.ArgumentParser(description="Server + Fake Direwolf + simulated clients benchmark, JSON results")
+    parser.add_argument('--clients', type=int, default=24)
+    parser.add_argument('--forms', type=int, default=20, help="Forms on the server at the start")
+    parser.add_argument('--changes', type=int, default=6, help="Forms edited, added or deleted for change_sync, relabelled for edit_sync")
+    parser.add_argument('--submissions', type=int, default=4, help="I (INSERT) per client")
+    parser.add_argument('--searches', type=int, default=2, help="S (SEARCH) per client")
+    parser.add_argument('--page-size', type=int, default=3, help="_page for searches, small so most get an N")
+    parser.add_argument('--cms-items', type=int, default=1, help="P (POST) and G (GET) per client")
+    parser.add_argument('--cms-size', type=int, default=150, help="Characters per CMS item")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--tx-baud', type=int, default=None, help="Server tx_baud, 0 = unpaced (default: the server's own)")
+    parser.add_argument('--beacon-interval', type=int, default=15, help="Server broadcast_interval in seconds")
+    parser.add_argument('--channel', action='store_true', help="Fake Direwolf's 1200-baud channel model (collisions, DCD)")
+    parser.add_argument('--baud', type=int, default=1200, help="For airtime_s")
+    parser.add_argument('--gap', type=float, default=1.0, help="Mean seconds between a client's requests")
+    parser.add_argument('--reply-timeout', type=float, default=120.0)
+    parser.add_argument('--timeout', type=float, default=300.0, help="Longest wait for clients to converge")
+    parser.add_argument('--settle', type=float, default=2.0, help="Seconds of quiet air (beacons aside) between scenarios")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="Earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Fraction worse than --baseline that counts as a regression")
+    parser.add_argument('--capture', help="Server capture_file for the run, for tools/kiss_replay.py (server v4.0.16 or later)")
+    parser.add_argument('--keep', action='store_true', help="Keep the work directory (logs, server data)")
+    # Internal: how the harness starts the headless server and Fake Direwolf
+    parser.add_argument('--role', choices=('server', 'direwolf'), help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    parser.add_argument('--kiss-port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--server-source', default=SERVER_SOURCE)
+    parser.add_argument('--client-source', default=CLIENT_SOURCE)
+    parser.add_argument('--direwolf-source', default=DIREWOLF_SOURCE)
+    args = parser.parse_args()
+    if args.role == 'server':
+        return run_server(args)
+    if args.role == 'direwolf':
+        return run_direwolf(args)
+
+    SERVER_SOURCE, CLIENT_SOURCE, DIREWOLF_SOURCE = (os.path.abspath(p) for p in (args.server_source, args.client_source, args.direwolf_source))
+    workdir = tempfile.mkdtemp(prefix='bench_harness_')
+    try:
+        report, failed = run(args, workdir)
+    finally:
+        if args.keep:
+            print(f"Work directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if report is None:
+        return 1
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        changed = sorted(key for key, value in report['settings'].items()
+                         if key in baseline.get('settings', {}) and baseline['settings'][key] != value and not key.endswith('_source'))
+        if changed:
+            print(f"  Settings differ from {args.baseline}: {', '.join(changed)}")
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"  Regression: {line}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        failed |= bool(regressions)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
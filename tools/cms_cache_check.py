@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# cms_cache_check.py
+# Version 1.0 - 2025-04-13
+# The CMS chunk cache of server v4.0.23 and the resumable G of terminal_client v5.0.16, run straight out of their
+# sources: the server's '# CMS Cache Functions' section with get_cms_content() and encode_info_field(), and the
+# client's '# CMS Cache Functions' section, each exec'd against a temporary CMS_DIR.
+#   chunks     - random items of --sizes characters: every chunk's cached info field fits one frame, and the
+#                chunks put back together give the file
+#   air        - G reply bytes on air per item size, v4.0.22 chunks (PACLEN - 32 characters each, split in two by
+#                the G header) against v4.0.23's cached one-frame chunks, counted like tools/airtime_report.py
+#   cache      - hits, a rewritten file (new mtime) and a P dropping the entry, cms_cache_items/_bytes eviction
+#   ranges     - "3-5,7@<version>" parsing: the wrong version, garbage and out-of-range numbers get sensible answers
+#   resume     - the client loses chunks, restarts (a fresh exec, only CMS_DIR kept) and asks for just the missing
+#                ones; an item changed on the server mid-transfer starts over
+#
+# Usage: python3 tools/cms_cache_check.py [--sizes 100 600 2000 8000] [--paclen 255] [--seed 1]
+# Exits non-zero if a chunk doesn't fit a frame, an item comes back wrong or the cache serves a stale copy.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import ax25_frame, frames_after, kiss_escape  # noqa: E402
+from sync_simulator import CLIENT_SOURCE, SERVER_SOURCE, function_source, source_section  # noqa: E402
+
+CATEGORY = 'news'
+
+def load_server(home, paclen, items=32, max_bytes=262144):
+    ns = {
+        'os': os, 'hashlib': hashlib, 'threading': threading, 'zlib': zlib, 'OrderedDict': OrderedDict,
+        'CMS_DIR': Path(home) / 'server_cms', 'CALLSIGN': 'SVR001', 'PACLEN': paclen, 'CMS_CACHE_ITEMS': items,
+        'CMS_CACHE_BYTES': max_bytes, 'COMPRESS_PAYLOADS': True, 'COMPRESSED_FLAG': b'\xFF', 'ZDICT_FLAG': b'\xFE',
+        'zdicts': {}, 'zdict_md5s': {}, 'LOG_COMPRESSION': False, 'log_event': lambda *a, **k: None,
+    }
+    for name in ('encode_info_field', 'get_cms_content'):
+        exec(compile(function_source(SERVER_SOURCE, name), SERVER_SOURCE, 'exec'), ns)
+    exec(compile(source_section(SERVER_SOURCE, '# CMS Cache Functions', '# Submission Storage Functions'), SERVER_SOURCE, 'exec'), ns)
+    return ns
+
+def load_client(home, sent):
+    ns = {
+        'os': os, 'json': json, 're': re, 'time': time, 'Path': Path, 'CMS_DIR': Path(home) / 'client_cms',
+        'CALLSIGN': 'CLT001', 'CMS_LIST_TTL': 3600, 'CMS_GET_RETRY': 30, 'CMS_GET_TRIES': 4, 'socket_connected': True,
+        'screen_dirty': False, 'LOG_CMS_OPERATIONS': False, 'log_event': lambda *a, **k: None,
+        'send_to_kiss': lambda stdscr, payload: sent.append(payload),
+    }
+    exec(compile(source_section(CLIENT_SOURCE, '# CMS Cache Functions', '# Outbox Functions'), CLIENT_SOURCE, 'exec'), ns)
+    return ns
+
+def write_item(server, item_id, content):
+    path = server['CMS_DIR'] / CATEGORY / f"{item_id}.txt"
+    os.makedirs(path.parent, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+def item_text(size, rng):
+    words = 'road closed shelter open water net check in relay power grid weather update station'.split()
+    lines, length = [], 0
+    while length < size:
+        line = ' '.join(rng.choice(words) for _ in range(rng.randrange(3, 12)))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)[:size]
+
+def chunk_parts(response):
+    """(function, category, content) of a G chunk as the client's listener splits it."""
+    function, _, category, content = response.split('|', 3)
+    return function, category, content
+
+def old_chunks(content, paclen, item_id):
+    """v4.0.22's get_cms_content()."""
+    content = content.replace('\n', '~')
+    size = paclen - 32
+    chunks = [content[i:i + size] for i in range(0, len(content), size)] or ['']
+    return [f"G{i+1:03d}/{len(chunks):03d}|SVR001|{CATEGORY}|{item_id}|{p}" for i, p in enumerate(chunks)]
+
+def check_chunks(server, args, rng):
+    failures = 0
+    print(f"{'size':>6} {'old chunks':>10} {'old frames':>10} {'old air':>8} {'new chunks':>10} {'new air':>8} {'saved':>6}")
+    for size in args.sizes:
+        item_id = f"item{size}"
+        content = item_text(size, rng)
+        write_item(server, item_id, content)
+        chunks = server['get_cms_content'](CATEGORY, item_id)
+        too_big = [response for response, info in chunks if info is None or len(info) > args.paclen - 32]
+        text = ''.join(chunk_parts(response)[2].split('|', 2)[2] for response, _ in chunks)
+        if too_big or text != content.replace('\n', '~'):
+            print(f"  {item_id}: {len(too_big)} chunks over one frame, text {'matches' if text == content.replace(chr(10), '~') else 'WRONG'}")
+            failures += 1
+        old = [frame for payload in old_chunks(content, args.paclen, item_id) for frame in frames_after(payload, True, args.paclen)]
+        old_air = sum(len(frame) for frame in old)
+        new_air = sum(len(kiss_escape(ax25_frame('SVR001', 'CLT001', info))) for _, info in chunks)
+        print(f"{size:>6} {len(old_chunks(content, args.paclen, item_id)):>10} {len(old):>10} {old_air:>8} {len(chunks):>10} "
+              f"{new_air:>8} {100 * (1 - new_air / old_air):>5.0f}%")
+    return failures
+
+def check_cache(home, args, rng):
+    failures = 0
+    server = load_server(home, args.paclen, items=3)
+    metrics = server['cms_cache_metrics']
+    path = write_item(server, 'a', item_text(500, rng))
+    first = server['get_cms_content'](CATEGORY, 'a')
+    second = server['get_cms_content'](CATEGORY, 'a')
+    if metrics['hits'] != 1 or metrics['misses'] != 1 or first != second:
+        print(f"  a second G wasn't a cache hit: {metrics}")
+        failures += 1
+    changed = item_text(500, rng)
+    with open(path, 'w') as f:
+        f.write(changed)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))  # A different mtime even on coarse clocks
+    text = ''.join(chunk_parts(r)[2].split('|', 2)[2] for r, _ in server['get_cms_content'](CATEGORY, 'a'))
+    if text != changed.replace('\n', '~'):
+        print("  a rewritten file was served from the cache")
+        failures += 1
+    server['get_cms_content'](CATEGORY, 'a')
+    server['invalidate_cms_cache'](CATEGORY, 'a')  # What post_cms_content() does after writing
+    misses = metrics['misses']
+    server['get_cms_content'](CATEGORY, 'a')
+    if metrics['misses'] != misses + 1:
+        print("  a P didn't drop the cached item")
+        failures += 1
+    for name in 'bcde':
+        write_item(server, name, item_text(300, rng))
+        server['get_cms_content'](CATEGORY, name)
+    if list(server['cms_cache']) != [(CATEGORY, name) for name in 'cde'] or metrics['evicted'] != 2:
+        print(f"  cms_cache_items = 3 kept {list(server['cms_cache'])}, evicted {metrics['evicted']}")
+        failures += 1
+    small = load_server(home, args.paclen, max_bytes=4000)
+    for name in 'abcde':
+        small['get_cms_content'](CATEGORY, name)
+    held = sum(entry['bytes'] for entry in small['cms_cache'].values())
+    if held > 4000 and len(small['cms_cache']) > 1:
+        print(f"  cms_cache_bytes = 4000 holds {held} bytes")
+        failures += 1
+    print(f"cache: hits, mtime and P invalidation, eviction by items ({metrics['evicted']}) and by bytes "
+          f"({small['cms_cache_metrics']['evicted']}) - {'OK' if not failures else 'FAILED'}")
+    return failures
+
+def check_ranges(server):
+    parse = server['parse_chunk_range']
+    cases = [('', 5, 'v', [1, 2, 3, 4, 5]), ('2-3,5@v', 5, 'v', [2, 3, 5]), ('2-3,5@old', 5, 'v', [1, 2, 3, 4, 5]),
+             ('4-9,0@v', 5, 'v', [4, 5]), ('x-2@v', 3, 'v', [1, 2, 3]), ('3@v', 3, 'v', [3]), ('3,3,1@v', 3, 'v', [1, 3])]
+    wrong = [(wanted, parse(wanted, count, version), expected) for wanted, count, version, expected in cases
+             if parse(wanted, count, version) != expected]
+    for wanted, got, expected in wrong:
+        print(f"  {wanted!r}: {got}, expected {expected}")
+    print(f"ranges: {len(cases)} cases - {'OK' if not wrong else 'FAILED'}")
+    return len(wrong)
+
+def deliver(client, responses):
+    status = None
+    for response in responses:
+        function, category, content = chunk_parts(response)
+        status = client['handle_cms_chunk'](category, function, content) or status
+    return status
+
+def serve(server, request):
+    """The server's G dispatch for a client's request."""
+    _, _, category, content = request.split('|', 3)
+    item_id, _, wanted = content.partition('|')
+    return [response for response, _ in server['get_cms_content'](category, item_id, wanted)]
+
+def check_resume(home, args, rng):
+    failures = 0
+    server = load_server(home, args.paclen)
+    content = item_text(4000, rng)
+    write_item(server, 'long', content)
+    sent = []
+    client = load_client(home, sent)
+    client['request_cms_item'](None, CATEGORY, 'long')
+    chunks = serve(server, sent[-1])
+    kept = [response for n, response in enumerate(chunks) if n % 3 != 1]  # A third lost on the air
+    deliver(client, kept)
+    client = load_client(home, sent)  # Restarted, only the .part.json survives
+    client['request_cms_item'](None, CATEGORY, 'long')
+    resent = serve(server, sent[-1])
+    status = deliver(client, resent)
+    item_path = client['CMS_DIR'] / CATEGORY / 'long.txt'
+    ok = (len(resent) == len(chunks) - len(kept) and status and item_path.is_file() and item_path.read_text() == content
+          and not (client['CMS_DIR'] / CATEGORY / 'long.part.json').exists())
+    print(f"resume: {len(chunks)} chunks, {len(chunks) - len(kept)} lost, asked again with {sent[-1].split('|', 4)[4]!r}, "
+          f"{len(resent)} resent - {'OK' if ok else 'FAILED'}")
+    failures += not ok
+
+    client['request_cms_item'](None, CATEGORY, 'long')
+    deliver(client, serve(server, sent[-1])[:2])
+    changed = item_text(4000, rng)
+    write_item(server, 'long', changed)
+    os.utime(server['CMS_DIR'] / CATEGORY / 'long.txt', ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+    client['request_cms_item'](None, CATEGORY, 'long')  # Asks for the rest of the old version...
+    deliver(client, serve(server, sent[-1]))  # ...and gets all of the new one
+    ok = item_path.read_text() == changed
+    print(f"resume after the item changed on the server: {'OK' if ok else 'FAILED'}")
+    failures += not ok
+
+    status = deliver(client, [f"G001/001|SVR001|{CATEGORY}|gone||Error: Item not found"])
+    ok = status and 'not found' in status and not (client['CMS_DIR'] / CATEGORY / 'gone.txt').exists()
+    print(f"missing item: {status!r} - {'OK' if ok else 'FAILED'}")
+    failures += not ok
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Server CMS chunk cache and the client's resumable G")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 600, 2000, 8000], help="Item sizes in characters")
+    parser.add_argument('--paclen', type=int, default=255)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as home:
+        failures = check_chunks(load_server(home, args.paclen), args, rng)
+        failures += check_cache(home, args, rng)
+        failures += check_ranges(load_server(home, args.paclen))
+        failures += check_resume(home, args, rng)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
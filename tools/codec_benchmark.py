@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# codec_benchmark.py
+# Version 1.0 - 2025-04-12
+# Frames per second through the KISS/AX.25 framing the server, client, Fake Direwolf and ax25_sender each carried
+# until server v4.0.17 / terminal_client v5.0.12 / Fake Direwolf v1.10, against lib/common/ax25_codec.txt.
+#   build  - old: build_ax25_packet() made a CRC function (crcmod.predefined.mkCrcFun, a 256-entry table) and
+#            encoded both callsigns on every call; new: ax25_codec.build_packet() and kiss_frame()
+#   decode - a burst of frames arriving in reads of --read-sizes bytes. Old: buffer += data, then a find and a
+#            buffer = buffer[end + 1:] copy per frame, a byte-at-a-time unescape and a generator per callsign.
+#            New: split_frames() on a bytearray, kiss_unescape() and decode_frame() with cached addresses
+# Without crcmod installed the old CRC function is crcmod's pure-Python table build and loop, which is what crcmod
+# falls back to without its C extension; install crcmod to time the real one.
+# Every frame's info field carries C0 and DB bytes, and some bursts share a FEND between frames, to check that
+# both paths still agree on escaping.
+#
+# Usage: python3 tools/codec_benchmark.py [--bursts 10,100,1000,5000] [--read-sizes 512,4096,65536] [--info 120]
+# Exits non-zero if the codec decodes a frame differently from what was sent.
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import ax25_frame, crc16, kiss_escape, load_codec  # noqa: E402
+
+ax25_codec = load_codec()
+CALLSIGNS = ['SVR001', 'CLT001', 'CLT002', 'KB1ABC', 'W1XYZ', 'N0CALL', 'K9DEF', 'AB1CD']
+
+# Old framing, as the programs had it
+
+def old_crc_function():
+    try:
+        import crcmod.predefined
+        return crcmod.predefined.mkCrcFun('crc-ccitt-false')
+    except ImportError:
+        table = []
+        for byte in range(256):
+            crc = byte << 8
+            for _ in range(8):
+                crc = (crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1
+            table.append(crc & 0xFFFF)
+        def crc16_table(data, crc=0xFFFF):
+            for byte in data:
+                crc = table[((crc >> 8) ^ byte) & 0xFF] ^ (crc << 8) & 0xFFFF
+            return crc
+        return crc16_table
+
+def old_build(source, dest, info):
+    crc16 = old_crc_function()
+    def encode_callsign(callsign, ssid=0, last=False):
+        callsign = callsign.ljust(6)[:6].upper()
+        ssid_byte = (0x60 | (ssid << 1) | (1 if last else 0))
+        return bytes([ord(c) << 1 for c in callsign]) + bytes([ssid_byte])
+    address = encode_callsign(dest) + encode_callsign(source, last=True)
+    frame = address + b'\x03\xF0' + info
+    fcs = crc16(frame).to_bytes(2, 'little')
+    packet = b'\x7E' + frame + fcs + b'\x7E'
+    kiss_data = packet.replace(b'\xDB', b'\xDB\xDD').replace(b'\xC0', b'\xDB\xDC')
+    return b'\xC0\x00' + kiss_data + b'\xC0'
+
+def old_unescape(kiss_data):
+    if b'\xDB' not in kiss_data:
+        return kiss_data
+    out = bytearray()
+    i = 0
+    while i < len(kiss_data):
+        b = kiss_data[i]
+        if b == 0xDB and i + 1 < len(kiss_data):
+            nxt = kiss_data[i + 1]
+            out.append(0xC0 if nxt == 0xDC else 0xDB if nxt == 0xDD else nxt)
+            i += 2
+            continue
+        out.append(b)
+        i += 1
+    return bytes(out)
+
+def old_decode(reads, crc16):
+    decoded = []
+    buffer = b""
+    for data in reads:
+        buffer += data
+        while b'\xC0' in buffer[1:]:
+            start = buffer.find(b'\xC0')
+            end = buffer.find(b'\xC0', start + 1)
+            if end == -1:
+                break
+            frame = buffer[start:end + 1]
+            buffer = buffer[end + 1:]
+            ax25_packet = old_unescape(frame[2:-1])
+            if len(ax25_packet) < 18 or ax25_packet[0] != 0x7E or ax25_packet[-1] != 0x7E:
+                continue
+            if ax25_packet[-3:-1] != crc16(ax25_packet[1:-3]).to_bytes(2, 'little'):
+                continue
+            dest = ''.join(chr(b >> 1) for b in ax25_packet[1:7]).strip()
+            src = ''.join(chr(b >> 1) for b in ax25_packet[8:14]).strip()
+            decoded.append((dest, src, ax25_packet[17:-3]))
+    return decoded
+
+# New framing
+
+def new_build(source, dest, info):
+    return ax25_codec.kiss_frame(ax25_codec.build_packet(dest, source, info))
+
+def new_decode(reads):
+    decoded = []
+    buffer = bytearray()
+    for data in reads:
+        buffer += data
+        for frame in ax25_codec.split_frames(buffer):
+            try:
+                decoded.append(ax25_codec.decode_frame(frame))
+            except ValueError:
+                continue
+    return decoded
+
+# Traffic
+
+def make_frames(count, info_size, rng):
+    """(source, dest, info) with binary info that needs escaping, like a compressed payload."""
+    frames = []
+    for _ in range(count):
+        source, dest = rng.sample(CALLSIGNS, 2)
+        info = bytes(rng.choice((0xC0, 0xDB, 0xDC, 0xDD)) if rng.random() < 0.1 else rng.randrange(256) for _ in range(info_size))
+        frames.append((source, dest, info))
+    return frames
+
+def make_stream(frames, shared_fend):
+    """The wire bytes, built by tools/airtime_report.py's independent framing, FEND shared between frames or not."""
+    wire = [kiss_escape(ax25_frame(source, dest, info)) for source, dest, info in frames]
+    return b''.join(frame[:-1] for frame in wire) + b'\xC0' if shared_fend else b''.join(wire)
+
+def chunks(stream, read_size):
+    return [stream[i:i + read_size] for i in range(0, len(stream), read_size)]
+
+def rate(function, count, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / max(best, 1e-9)
+
+def main():
+    parser = argparse.ArgumentParser(description="KISS/AX.25 framing: frames per second, old copies vs ax25_codec")
+    parser.add_argument('--bursts', default='10,100,1000,5000', help="Frames per burst, comma-separated")
+    parser.add_argument('--read-sizes', default='512,4096,65536', help="recv() sizes, comma-separated (client 512, server 4096)")
+    parser.add_argument('--info', type=int, default=120, help="Info field bytes per frame")
+    parser.add_argument('--builds', type=int, default=2000, help="Frames built for the build rate")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    failures = 0
+
+    print(f"Old CRC: {'crcmod' if importlib.util.find_spec('crcmod') else 'crcmod not installed, its pure-Python fallback'}")
+
+    frames = make_frames(args.builds, args.info, rng)
+    for source, dest, info in frames:
+        if new_build(source, dest, info) != old_build(source, dest, info) or \
+                new_build(source, dest, info) != kiss_escape(ax25_frame(source, dest, info)):
+            print(f"Build mismatch: {source}>{dest} {info.hex()}")
+            failures += 1
+            break
+    old = rate(lambda: [old_build(*frame) for frame in frames], len(frames))
+    new = rate(lambda: [new_build(*frame) for frame in frames], len(frames))
+    print(f"build: {old:10,.0f} -> {new:10,.0f} frames/s ({new / old:.1f}x)")
+    check = frames[0][2]
+    if ax25_codec.crc16(check) != crc16(check) or ax25_codec.crc16(check) != old_crc_function()(check):
+        print("CRC mismatch between the codec, airtime_report and the old function")
+        failures += 1
+
+    print(f"decode, {args.info}-byte info fields:")
+    print(f"  {'burst':>6} {'read':>6} {'shared FEND':>11} {'old frames/s':>13} {'new frames/s':>13} {'speedup':>8}")
+    old_crc = old_crc_function()
+    for burst in [int(n) for n in args.bursts.split(',')]:
+        burst_frames = make_frames(burst, args.info, rng)
+        expected = [(dest, source, info) for source, dest, info in burst_frames]
+        for read_size in [int(n) for n in args.read_sizes.split(',')]:
+            for shared_fend in (False, True):
+                reads = chunks(make_stream(burst_frames, shared_fend), read_size)
+                got = new_decode(reads)
+                if got != expected:
+                    print(f"  Decode mismatch, burst {burst}, read {read_size}, shared FEND {shared_fend}: "
+                          f"{len(got)} of {burst} frames")
+                    failures += 1
+                repeat = 1 if burst >= 1000 else 3
+                old = rate(lambda: old_decode(reads, old_crc), burst, repeat)
+                new = rate(lambda: new_decode(reads), burst, repeat)
+                lost = '' if shared_fend is False else f" (old path decodes {len(old_decode(reads, old_crc))})"
+                print(f"  {burst:>6} {read_size:>6} {'yes' if shared_fend else 'no':>11} {old:>13,.0f} {new:>13,.0f} "
+                      f"{new / old:>7.1f}x{lost}")
+    if failures:
+        print(f"{failures} mismatches")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
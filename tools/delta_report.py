@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# delta_report.py
+# Version 1.0 - 2025-04-13
+# Bytes on air to bring a client's copy of a changed form or CMS push item up to date: the whole file in U, as
+# before server v4.0.22, versus V (DELTA) line edits against the version the client holds. Both ends run the real
+# code: the server's '# Delta Sync Functions' section (version history and edit scripts) and the client's
+# apply_delta_update(), exec'd into temporary directories, so every delta is also checked to give the server's
+# file byte for byte. Air bytes are compressed frames as tools/airtime_report.py counts them (no dictionary).
+# Edits: one field relabelled, a field added, a field removed, a tenth of the lines changed, and a rewrite (which
+# should fall back to U). Random edits to random files (blank lines, no trailing newline) check the round trip,
+# and a V for another base or with a corrupted script must leave the client's file alone.
+#
+# Usage: python3 tools/delta_report.py [--fields 12] [--bulletin-lines 60] [--paclen 255] [--fuzz 300] [--seed 1]
+# Exits non-zero if a delta gives the wrong file or a bad V is applied.
+
+import argparse
+import difflib
+import hashlib
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import frames_after  # noqa: E402
+from sync_simulator import CLIENT_SOURCE, SERVER_SOURCE, function_source, source_section  # noqa: E402
+
+def load_server(home):
+    ns = {
+        'os': os, 'hashlib': hashlib, 'difflib': difflib, 'DATA_DIR': os.path.join(home, 'server_data'),
+        'FORMS_DIR': os.path.join(home, 'forms'), 'CMS_PUSH_DIR': Path(home) / 'cms' / 'push', 'CALLSIGN': 'SVR001',
+        'DELTA_SYNC': True, 'DELTA_HISTORY': 4, 'DELTA_MAX_BYTES': 65536, 'DELTA_MAX_BASES': 3, 'LOG_DIFF_STATE': False,
+        'sync_metrics': {'delta_files': 0, 'delta_saved': 0}, 'log_event': lambda *a, **k: None,
+    }
+    exec(compile(source_section(SERVER_SOURCE, '# Delta Sync Functions', '# Transmit Scheduler Functions'), SERVER_SOURCE, 'exec'), ns)
+    return ns
+
+def load_client(home):
+    ns = {
+        'os': os, 'hashlib': hashlib, 'FORMS_DIR': os.path.join(home, 'forms'), 'CMS_PUSH_DIR': Path(home) / 'cms' / 'push',
+        'delta_failed': set(), 'LOG_SYNC_MISMATCHES': False, 'log_event': lambda *a, **k: None,
+    }
+    for name in ('apply_delta_script', 'sync_file_path', 'apply_delta_update'):
+        exec(compile(function_source(CLIENT_SOURCE, name), CLIENT_SOURCE, 'exec'), ns)
+    return ns
+
+# Content
+
+def form_text(fields, rng):
+    lines = [f"desc:Field report {rng.randrange(1000)}"]
+    lines += [f"F{n:02d},{rng.choice(('Name', 'Location', 'Status', 'Notes', 'Contact'))} {n},{n + 2},2,256" for n in range(1, fields + 1)]
+    return '\n'.join(lines) + '\n'
+
+def bulletin_text(lines, rng):
+    words = 'net check in relay station power antenna grid weather road closed shelter open water supply update'.split()
+    return '\n'.join(' '.join(rng.choice(words) for _ in range(rng.randrange(4, 14))) for _ in range(lines)) + '\n'
+
+def edit(text, kind, rng):
+    lines = text.split('\n')
+    body = range(1, len(lines) - 1)
+    if kind == 'relabel one line':
+        n = rng.choice(body)
+        lines[n] = lines[n].replace(',', ' (edited),', 1) if ',' in lines[n] else lines[n] + ' (edited)'
+    elif kind == 'add a line':
+        lines.insert(rng.choice(body), 'F99,Added field,40,2,256')
+    elif kind == 'remove a line':
+        del lines[rng.choice(body)]
+    elif kind == 'change a tenth':
+        for n in rng.sample(body, max(1, len(lines) // 10)):
+            lines[n] = lines[n][::-1]
+    else:
+        return bulletin_text(len(lines), rng)
+    return '\n'.join(lines)
+
+# One update
+
+def u_packet(name, content):
+    return f"U|SVR001|{name}|" + content.strip().replace('\n', '~')
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def sync_one(server, client, collection, name, base, target):
+    """Base on both sides and in the history, target on the server; returns (V packets or None, client file ok)."""
+    path = server['sync_file_path'](collection, name)
+    client_path = client['sync_file_path'](name)
+    write(str(path), base)
+    server['remember_sync_version'](path, base, hashlib.md5(base).hexdigest())
+    write(str(path), target)
+    server['remember_sync_version'](path, target, hashlib.md5(target).hexdigest())
+    write(str(client_path), base)
+    packets = server['build_delta_updates'](collection, name, {hashlib.md5(base).hexdigest()[:12]})
+    if packets is None:
+        return None, True
+    applied = [client['apply_delta_update'](name, packet.split('|', 3)[3]) for packet in packets]
+    with open(client_path, 'rb') as f:
+        return packets, any(applied) and f.read() == target
+
+def air(payloads, paclen):
+    return sum(len(frame) for payload in payloads for frame in frames_after(payload, True, paclen))
+
+def report(server, client, args, rng):
+    failures = 0
+    print(f"{'file':<22} {'edit':<18} {'U bytes':>8} {'V bytes':>8} {'U air':>6} {'V air':>6} {'saved':>6}")
+    samples = [('form', 'NONE', 'FIELD01', lambda: form_text(args.fields, rng)),
+               ('bulletin', 'PUSH', 'push/bulletin-001.txt', lambda: bulletin_text(args.bulletin_lines, rng))]
+    for label, collection, name, make in samples:
+        for kind in ('relabel one line', 'add a line', 'remove a line', 'change a tenth', 'rewrite'):
+            base = make()
+            target = edit(base, kind, rng)
+            packets, ok = sync_one(server, client, collection, name, base.encode(), target.encode())
+            full = u_packet(name, target)
+            u_air = air([full], args.paclen)
+            v_air = air(packets, args.paclen) if packets else u_air
+            v_bytes = sum(len(p) for p in packets) if packets else len(full)
+            note = '' if packets else ' (sent as U)'
+            print(f"{label + ' ' + str(len(base)) + ' B':<22} {kind:<18} {len(full):>8} {v_bytes:>8} {u_air:>6} {v_air:>6} "
+                  f"{100 * (1 - v_air / u_air):>5.0f}%{note}")
+            if not ok:
+                print(f"  {label}, {kind}: client file doesn't match the server's")
+                failures += 1
+    return failures
+
+def fuzz(server, client, count, rng):
+    """Random files and edits through the whole path; returns (failures, deltas sent)."""
+    failures = sent = 0
+    alphabet = ['', 'a', 'b,c', 'desc:x', '  indented', 'F01,Name,3,2,256', 'é']
+    for n in range(count):
+        base_lines = [rng.choice(alphabet) + str(rng.randrange(5)) for _ in range(rng.randrange(0, 30))]
+        target_lines = list(base_lines)
+        for _ in range(rng.randrange(0, 6)):
+            op = rng.randrange(3)
+            if op == 0 or not target_lines:
+                target_lines.insert(rng.randrange(len(target_lines) + 1), rng.choice(alphabet))
+            elif op == 1:
+                del target_lines[rng.randrange(len(target_lines))]
+            else:
+                target_lines[rng.randrange(len(target_lines))] = rng.choice(alphabet) + 'x'
+        base = '\n'.join(base_lines) + rng.choice(('', '\n', '\n\n'))
+        target = '\n'.join(target_lines) + rng.choice(('', '\n'))
+        if base == target:
+            continue
+        packets, ok = sync_one(server, client, 'NONE', f"FUZZ{n % 7}", base.encode(), target.encode())
+        sent += packets is not None
+        if not ok:
+            print(f"  fuzz {n}: {base!r} -> {target!r} gave the wrong file")
+            failures += 1
+    return failures, sent
+
+def bad_deltas(server, client, rng):
+    """A V for another base and a corrupted one must leave the client's file alone; the corrupted one marks the name."""
+    failures = 0
+    base = form_text(8, rng)
+    target = edit(base, 'relabel one line', rng)
+    packets, _ = sync_one(server, client, 'NONE', 'BAD01', base.encode(), target.encode())
+    path = client['sync_file_path']('BAD01')
+    other = form_text(8, rng).encode()
+    write(path, other)
+    if client['apply_delta_update']('BAD01', packets[0].split('|', 3)[3]) or open(path, 'rb').read() != other or 'BAD01' in client['delta_failed']:
+        print("  A V for another base was applied")
+        failures += 1
+    write(path, base.encode())
+    header, _, script = packets[0].split('|', 3)[3].partition('|')
+    if client['apply_delta_update']('BAD01', f"{header}|=1~+corrupted~{script}") or open(path, 'rb').read() != base.encode():
+        print("  A corrupted V was applied")
+        failures += 1
+    if 'BAD01' not in client['delta_failed']:
+        print("  A corrupted V didn't mark the name for a whole-file U")
+        failures += 1
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Air bytes for changed forms/push items, whole-file U vs V line edits")
+    parser.add_argument('--fields', type=int, default=12, help="Fields in the sample form")
+    parser.add_argument('--bulletin-lines', type=int, default=60, help="Lines in the sample push bulletin")
+    parser.add_argument('--paclen', type=int, default=255)
+    parser.add_argument('--fuzz', type=int, default=300, help="Random edits round-tripped")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as server_home, tempfile.TemporaryDirectory() as client_home:
+        server, client = load_server(server_home), load_client(client_home)
+        failures = report(server, client, args, rng)
+        fuzz_failures, sent = fuzz(server, client, args.fuzz, rng)
+        print(f"fuzz: {args.fuzz} random edits, {sent} sent as V, {fuzz_failures} wrong - {'OK' if not fuzz_failures else 'FAILED'}")
+        bad = bad_deltas(server, client, rng)
+        print(f"V for another base or corrupted: {'OK' if not bad else 'FAILED'}")
+    return 1 if failures + fuzz_failures + bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# fanout_stress.py
+# Version 1.0 - 2025-04-08
+# Fan-out stress test for Fake Direwolf's relay core (v1.07). Runs the '# Relay Core Functions' section on a free
+# port with 50 KISS clients: one sends, one never reads (a small receive buffer, so its socket fills fast) and
+# the other 48 read everything. Before v1.07 each frame went out with a blocking send() per client while holding
+# screen_lock, so the stalled client froze delivery to everyone and the status screen with it. Now the stalled
+# client only fills its own outbox and relay_backpressure deals with it.
+#   drop_oldest - the stalled client loses its oldest frames, stays connected
+#   disconnect  - the stalled client is cut off once its outbox is full
+# The readers must get every frame, in order, and screen_lock must never be held long (what the display waits on).
+#
+# Usage: python3 tools/fanout_stress.py [--clients 50] [--frames 5000] [--rate 1000] [--queue 64]
+# Exits non-zero if a reader misses frames or the stalled client isn't handled.
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import selectors
+import socket
+import statistics
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, ax25_frame, kiss_escape, load_codec, load_metrics  # noqa: E402
+from sync_simulator import function_source, source_section  # noqa: E402
+
+DIREWOLF_SOURCE = os.path.join(REPO_DIR, 'lib', 'direwolf', 'Fake_Direwolf_v1.05.txt')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def load_relay(port, queue_frames, policy):
+    ns = {
+        'socket': socket, 'selectors': selectors, 'threading': threading, 'time': time, 'sys': sys, 'deque': deque,
+        'log': lambda message: None, 'KISS_PORT': port, 'BUFFER_SIZE': 1024, 'CHANNEL_MODEL': False,
+        'RELAY_QUEUE_FRAMES': queue_frames, 'RELAY_BACKPRESSURE': policy, 'MAX_STATUS_LINES': 5,
+        'screen_lock': threading.Lock(), 'screen_needs_update': {}, 'packet_log': deque(maxlen=20),
+        'status_messages': deque(maxlen=5), 'active_kiss_clients': [], 'stop_event': threading.Event(),
+        'peer_socket': None, 'random': random, 'CHANNEL_SEED': 1200,  # decode_payload() runs into the channel globals
+        'OrderedDict': OrderedDict, 'hashlib': hashlib, 'MESH_NODE_ID': 'stress', 'MESH_DUP_TTL': 30,  # Mesh section, v1.08
+        'CAPTURE_FILE': '', 'ax25_codec': load_codec(), 'metrics': load_metrics(),  # v1.09, v1.10, v1.11
+    }
+    ns.update({name: False for name in set(re.findall(r'\b(LOG_[A-Z_]+)\b', open(DIREWOLF_SOURCE).read()))})
+    for name in ('add_status_message', 'ax25_fields', 'parse_ax25_callsigns', 'decode_payload', 'frame_function'):
+        exec(function_source(DIREWOLF_SOURCE, name), ns)
+    exec(source_section(DIREWOLF_SOURCE, '# Relay Core Functions', 'def handle_peer('), ns)
+    return ns
+
+def lock_watch(lock, stop, waits):
+    """What the status screen sees: how long screen_lock takes to get, every 5 ms."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        with lock:
+            waits.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+def read_all(readers, frames, sent_at, received, latencies, stop):
+    selector = selectors.DefaultSelector()
+    buffers = {}
+    for n, sock in enumerate(readers):
+        selector.register(sock, selectors.EVENT_READ, n)
+        buffers[n] = b""
+    while not stop.is_set() and min(received) < frames:
+        for key, _ in selector.select(0.1):
+            data = key.fileobj.recv(65536)
+            if not data:
+                selector.unregister(key.fileobj)
+                continue
+            n = key.data
+            buffers[n] += data
+            while True:
+                start = buffers[n].find(b'\xC0')
+                end = buffers[n].find(b'\xC0', start + 1)
+                if start == -1 or end == -1:
+                    break
+                frame = buffers[n][start:end + 1]
+                buffers[n] = buffers[n][end + 1:]
+                if len(frame) <= 2:
+                    continue
+                seq = int(frame[frame.index(b'SEQ') + 3:][:6])
+                if seq != received[n]:
+                    received[n] = -frames  # Out of order or a gap, never adds up now
+                received[n] += 1
+                latencies.append(time.perf_counter() - sent_at[seq])
+    selector.close()
+
+def run(policy, args):
+    port = free_port()
+    ns = load_relay(port, args.queue, policy)
+    core = threading.Thread(target=ns['relay_core'], daemon=True)
+    core.start()
+    time.sleep(0.2)
+    stalled = socket.socket()
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled.connect(('127.0.0.1', port))
+    sender = socket.create_connection(('127.0.0.1', port))
+    readers = [socket.create_connection(('127.0.0.1', port)) for _ in range(args.clients - 2)]
+    deadline = time.time() + 5
+    while len(ns['active_kiss_clients']) < args.clients and time.time() < deadline:
+        time.sleep(0.01)
+    payload = b"I|STRESS|_FANOUT|L01="
+    frames = [kiss_escape(ax25_frame('STRES1', 'SVR001', payload + b"SEQ%06d" % n)) for n in range(args.frames)]
+    sent_at = [0.0] * args.frames
+    received = [0] * len(readers)
+    latencies, waits = [], []
+    stop = threading.Event()
+    reader = threading.Thread(target=read_all, args=(readers, args.frames, sent_at, received, latencies, stop), daemon=True)
+    watcher = threading.Thread(target=lock_watch, args=(ns['screen_lock'], stop, waits), daemon=True)
+    reader.start()
+    watcher.start()
+    start = time.perf_counter()
+    for n, frame in enumerate(frames):
+        sent_at[n] = time.perf_counter()
+        sender.sendall(frame)
+        if n % 10 == 9:
+            time.sleep(max(0, start + (n + 1) / args.rate - time.perf_counter()))
+    reader.join(args.timeout)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stalled_stats = [o for o in ns['relay_snapshot']() if o[0] == stalled.getsockname()]
+    ns['stop_event'].set()
+    core.join(2)
+    for sock in [stalled, sender] + readers:
+        sock.close()
+    return {
+        'complete': sum(1 for count in received if count == args.frames), 'readers': len(readers), 'elapsed': elapsed,
+        'latencies': sorted(latencies), 'lock_max': max(waits) if waits else 0.0,
+        'stalled': stalled_stats[0] if stalled_stats else None, 'totals': dict(ns['relay_totals']),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Direwolf relay fan-out with one client that never reads")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=1000, help="Frames per second from the sender")
+    parser.add_argument('--queue', type=int, default=64, help="relay_queue_frames")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    failures = 0
+    for policy in ('drop_oldest', 'disconnect'):
+        result = run(policy, args)
+        lat = result['latencies']
+        print(f"{policy}: {result['complete']}/{result['readers']} readers got all {args.frames} frames in order, "
+              f"{result['elapsed']:.2f} s")
+        if lat:
+            print(f"  Relay latency: median {statistics.median(lat) * 1000:.2f} ms, "
+                  f"p99 {lat[int(len(lat) * 0.99)] * 1000:.2f} ms, max {lat[-1] * 1000:.2f} ms")
+        print(f"  Longest screen_lock wait: {result['lock_max'] * 1000:.2f} ms")
+        if result['stalled']:
+            _, _, depth, depth_max, sent, dropped = result['stalled']
+            print(f"  Stalled client: connected, {sent} sent, {dropped} dropped, outbox {depth} (deepest {depth_max})")
+        else:
+            print(f"  Stalled client: cut off ({result['totals']['disconnected']} disconnected)")
+        if result['complete'] != result['readers']:
+            failures += 1
+        if policy == 'drop_oldest' and not (result['stalled'] and result['stalled'][5]):
+            failures += 1
+        if policy == 'disconnect' and result['stalled']:
+            failures += 1
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ FORM_DIR="$TARGET_DIR/forms"
 DESKTOP_FILE="/usr/share/applications/terminal_client.desktop"
 DESKTOP_USER="$HOME/Desktop/terminal_client.desktop"
 APP_NAME="terminal_client.py"
+CODEC_NAME="ax25_codec.py"  # CHANGE: Added for terminal_client.py v5.0.12 shared KISS/AX.25 codec
+METRICS_NAME="metrics.py"  # CHANGE: Added for terminal_client.py v5.0.17 shared metrics registry
 SOURCE_DIR="$(dirname "$(realpath "$0")")"
 
 if [ "$EUID" -ne 0 ]; then
@@ -41,7 +43,8 @@ else
 fi
 
 # List of required Python packages  # CHANGE: Added crcmod for v4.3.5 AX.25 support
-PYTHON_PACKAGES=("pandas" "tabulate" "crcmod")
+# PYTHON_PACKAGES=("pandas" "tabulate" "crcmod")
+PYTHON_PACKAGES=("pandas" "tabulate")  # CHANGE: crcmod dropped, v5.0.12 computes the FCS in ax25_codec.py
 
 # Check and install each Python package
 for pkg in "${PYTHON_PACKAGES[@]}"; do
@@ -67,6 +70,8 @@ done
 # Copy installer and app to home (unchanged)
 cp "$SOURCE_DIR/install_client.sh" "$HOME/" || { echo "Failed to copy install_client.sh"; exit 1; }
 cp "$SOURCE_DIR/$APP_NAME" "$HOME/" || { echo "Failed to copy $APP_NAME"; exit 1; }
+cp "$SOURCE_DIR/$CODEC_NAME" "$HOME/" || { echo "Failed to copy $CODEC_NAME"; exit 1; }  # CHANGE: terminal_client.py imports it
+cp "$SOURCE_DIR/$METRICS_NAME" "$HOME/" || { echo "Failed to copy $METRICS_NAME"; exit 1; }  # CHANGE: So does v5.0.17
 chmod +x "$HOME/install_client.sh"
 
 # Set up directories (unchanged)
@@ -79,6 +84,12 @@ if [ -f "$HOME/$APP_NAME" ]; then
     cp "$HOME/$APP_NAME" "$TARGET_DIR/"
     chmod 775 "$TARGET_DIR/$APP_NAME"
     chgrp users "$TARGET_DIR/$APP_NAME"
+    cp "$HOME/$CODEC_NAME" "$TARGET_DIR/"  # CHANGE: Next to the app so its import finds it
+    chmod 664 "$TARGET_DIR/$CODEC_NAME"
+    chgrp users "$TARGET_DIR/$CODEC_NAME"
+    cp "$HOME/$METRICS_NAME" "$TARGET_DIR/"
+    chmod 664 "$TARGET_DIR/$METRICS_NAME"
+    chgrp users "$TARGET_DIR/$METRICS_NAME"
 else
     echo "Error: $APP_NAME not found in $HOME"
     exit 1
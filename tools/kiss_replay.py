@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# kiss_replay.py
+# Version 1.1 - 2025-04-12 - Frames split and addresses decoded with lib/common/ax25_codec.txt
+# Version 1.0 - 2025-04-11
+# Lists or replays a KISS capture: the capture_file written by server v4.0.16, terminal_client v5.0.11 or Fake
+# Direwolf v1.09, or the LOG_FILE.frames dump the server and client write at exit. Every entry is FRAME_RECORD
+# ('>dcH': time, direction, length) then the KISS frame. Direction is R for received and T for sent by the server
+# or client, R from a KISS client or P from a mesh link for Fake Direwolf.
+#   --list             - one line per frame, decoded, instead of digging through hex dumps in the logs; payloads
+#                        packed with the preset dictionary need --zdict, the _zdict.txt form from either end
+#   --serve PORT       - stand in for Fake Direwolf: the server or client under test connects to PORT
+#                        (fake_direwolf_port) and gets the frames it received when the capture was taken
+#   --connect HOST:PORT - feed them into a running Fake Direwolf as a KISS client, which relays them on
+# Frames go out with their captured spacing divided by --speed, --speed 0 sends them back to back, --max-gap caps
+# the idle gaps of a long field capture. Whatever the target sends back is counted by function and set against
+# the T frames in the capture, so a server capture replayed into a new server version shows what it now answers.
+# Replays are the same frames in the same order every time, for parser/dispatcher regressions and throughput.
+#
+# Usage: python3 tools/kiss_replay.py CAPTURE [--list] [--direction R] [--serve 8051 | --connect 127.0.0.1:8051]
+#                                     [--speed 1] [--max-gap 5] [--skip 0] [--count 0] [--drain 5] [--zdict _zdict.txt]
+# Exits non-zero if the capture is cut short or the target disconnects before the replay ends.
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import load_codec  # noqa: E402
+
+ax25_codec = load_codec()
+
+FRAME_RECORD = struct.Struct('>dcH')  # Same as the server's, client's and Fake Direwolf's
+COMPRESSED_FLAG = b'\xFF'
+ZDICT_FLAG = b'\xFE'
+zdicts = {}  # {version: dictionary bytes} from --zdict
+
+def load_zdict(path):
+    """The server's load_zdict_file(): 'version:N' line, then the dictionary with newlines carried as ~."""
+    with open(path) as f:
+        header, _, body = f.read().partition('\n')
+    if header.startswith('version:'):
+        zdicts[int(header.split(':', 1)[1])] = body.replace('~', '\n').strip().replace('\n', '~').encode()
+
+def read_capture(path):
+    """(time, direction, frame) for every whole entry, and whether the file ended mid-entry (a process killed mid-write)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    entries, offset = [], 0
+    while offset + FRAME_RECORD.size <= len(data):
+        ts, direction, length = FRAME_RECORD.unpack_from(data, offset)
+        offset += FRAME_RECORD.size
+        if offset + length > len(data):
+            return entries, True
+        entries.append((ts, direction.decode('ascii', errors='replace'), data[offset:offset + length]))
+        offset += length
+    return entries, offset != len(data)
+
+def frame_info(frame):
+    """(source, dest, payload text) of a KISS frame, payload inflated unless it needs a preset dictionary."""
+    packet = ax25_codec.kiss_unescape(frame[2:-1])
+    if packet[:1] == b'\x7E':
+        packet = packet[1:]
+    if len(packet) < 19:
+        return '?', '?', f"<{len(frame)} bytes: {frame.hex()}>"
+    info = packet[16:-3] if packet[-1:] == b'\x7E' else packet[16:-2]
+    if info[:1] == ZDICT_FLAG and len(info) > 1 and info[1] not in zdicts:
+        text = f"<dictionary v{info[1]}, {len(info)} bytes>"
+    elif info[:1] == ZDICT_FLAG and len(info) > 1:
+        try:
+            inflater = zlib.decompressobj(-15, zdict=zdicts[info[1]])
+            text = (inflater.decompress(info[2:]) + inflater.flush()).decode('ascii', errors='replace')
+        except zlib.error:
+            text = f"<bad dictionary v{info[1]} payload, {len(info)} bytes>"
+    elif info[:1] == COMPRESSED_FLAG:
+        try:
+            text = zlib.decompress(info[1:]).decode('ascii', errors='replace')
+        except zlib.error:
+            text = f"<bad zlib, {len(info)} bytes>"
+    else:
+        text = info.decode('ascii', errors='replace')
+    return ax25_codec.decode_address(packet[7:14]), ax25_codec.decode_address(packet[0:7]), text
+
+def function_of(frame):
+    text = frame_info(frame)[2]
+    return text[0] if text[1:2] == '|' else 'zdict' if text.startswith('<dictionary') else '?'
+
+def count_functions(frames):
+    counts = {}
+    for frame in frames:
+        function = function_of(frame)
+        counts[function] = counts.get(function, 0) + 1
+    return counts
+
+def list_capture(entries):
+    start = entries[0][0] if entries else 0
+    for ts, direction, frame in entries:
+        source, dest, text = frame_info(frame)
+        print(f"{ts - start:+11.3f} {direction} {source:>9}>{dest:<9} {text}")
+
+def read_replies(sock, replies, stop, closed):
+    buffer = bytearray()
+    sock.settimeout(0.2)
+    while not stop.is_set():
+        try:
+            data = sock.recv(65536)
+        except socket.timeout:
+            continue
+        except OSError:
+            data = b""
+        if not data:
+            closed.set()
+            return
+        buffer += data
+        now = time.time()
+        replies.extend((now, frame) for frame in ax25_codec.split_frames(buffer))
+
+def open_target(args):
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        sock = socket.create_connection((host or '127.0.0.1', int(port)))
+        print(f"Connected to {args.connect}")
+        return sock
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('0.0.0.0', args.serve))
+    server.listen(1)
+    print(f"Waiting on port {args.serve} for the server or client under test (fake_direwolf_port = {args.serve})")
+    sock, addr = server.accept()
+    server.close()
+    print(f"{addr[0]}:{addr[1]} connected")
+    return sock
+
+def replay(entries, args):
+    sock = open_target(args)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    replies, stop, closed = [], threading.Event(), threading.Event()
+    reader = threading.Thread(target=read_replies, args=(sock, replies, stop, closed), daemon=True)
+    reader.start()
+    time.sleep(args.wait)
+    start = time.perf_counter()
+    offset, previous, lag, sent_bytes = 0.0, None, 0.0, 0
+    for n, (ts, _, frame) in enumerate(entries):
+        if previous is not None and args.speed:
+            gap = (ts - previous) / args.speed
+            offset += min(gap, args.max_gap) if args.max_gap else gap
+        previous = ts
+        if args.speed:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+        if closed.is_set():
+            print(f"Target disconnected after {n} of {len(entries)} frames")
+            break
+        try:
+            sock.sendall(frame)
+        except OSError as e:
+            print(f"Send failed after {n} of {len(entries)} frames: {e}")
+            closed.set()
+            break
+        sent_bytes += len(frame)
+    else:
+        n = len(entries)
+    elapsed = time.perf_counter() - start
+    quiet_since = time.time()
+    while not closed.is_set() and time.time() - max([quiet_since] + [when for when, _ in replies[-1:]]) < args.drain:
+        time.sleep(0.1)
+    stop.set()
+    reader.join(1)
+    sock.close()
+    return n, sent_bytes, elapsed, lag, [frame for _, frame in replies], closed.is_set() and n < len(entries)
+
+def main():
+    parser = argparse.ArgumentParser(description="List or replay a KISS capture into a server, client or Fake Direwolf")
+    parser.add_argument('capture', help="capture_file or LOG_FILE.frames dump")
+    parser.add_argument('--list', action='store_true', help="Print every frame decoded and stop")
+    parser.add_argument('--direction', default=None,
+                        help="Directions to list or replay, e.g. R, T or RP (default: all for --list, R and P to replay)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--serve', type=int, metavar='PORT', help="Listen like Fake Direwolf, replay to what connects")
+    target.add_argument('--connect', metavar='HOST:PORT', help="Replay into a running Fake Direwolf's KISS port")
+    parser.add_argument('--speed', type=float, default=1.0, help="1 is real time, 10 ten times faster, 0 back to back")
+    parser.add_argument('--max-gap', type=float, default=0, help="Longest idle gap in seconds after scaling, 0 keeps them")
+    parser.add_argument('--skip', type=int, default=0, help="Frames skipped at the start")
+    parser.add_argument('--count', type=int, default=0, help="Frames replayed, 0 for all")
+    parser.add_argument('--wait', type=float, default=1.0, help="Seconds after connecting before the first frame")
+    parser.add_argument('--zdict', help="_zdict.txt form to decode preset dictionary payloads with")
+    parser.add_argument('--drain', type=float, default=5.0, help="Quiet seconds to wait for replies after the last frame")
+    args = parser.parse_args()
+
+    if args.zdict:
+        load_zdict(args.zdict)
+    entries, truncated = read_capture(args.capture)
+    if truncated:
+        print(f"{args.capture} ends mid-entry, {len(entries)} whole frames read")
+    captured = entries
+    directions = args.direction or ('RTP' if args.list or not (args.serve or args.connect) else 'RP')
+    entries = [entry for entry in entries if entry[1] in directions][args.skip:]
+    if args.count:
+        entries = entries[:args.count]
+    if args.list:
+        list_capture(entries)
+        return 1 if truncated else 0
+    span = entries[-1][0] - entries[0][0] if entries else 0
+    print(f"{len(entries)} frames ({''.join(sorted(set(e[1] for e in entries)))}), {sum(len(e[2]) for e in entries)} bytes "
+          f"over {span:.1f} s: {count_functions(e[2] for e in entries)}")
+    if not (args.serve or args.connect):
+        return 1 if truncated else 0
+
+    n, sent_bytes, elapsed, lag, replies, cut_short = replay(entries, args)
+    print(f"Replayed {n} frames / {sent_bytes} bytes in {elapsed:.2f} s ({n / max(elapsed, 1e-6):.1f} frames/s, "
+          f"{sent_bytes / 1024 / max(elapsed, 1e-6):.1f} kB/s), captured span {span:.1f} s, speed {args.speed or 'max'}")
+    if args.speed:
+        print(f"  Furthest behind schedule: {lag * 1000:.1f} ms")
+    print(f"  Replies: {len(replies)} frames: {count_functions(replies)}")
+    answered = [e[2] for e in captured if e[1] == 'T' and entries and entries[0][0] <= e[0] <= entries[-1][0] + args.drain]
+    if answered:
+        print(f"  Captured: {len(answered)} frames: {count_functions(answered)}")
+    return 1 if truncated or cut_short else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
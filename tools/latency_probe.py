@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# latency_probe.py
+# Version 1.0 - 2025-04-04
+# Measures server turnaround through Fake Direwolf: time from an I (INSERT) frame leaving the probe
+# to the server's A (ACK) frame arriving back. Fake Direwolf relays in microseconds, so the number is the
+# server's frame-arrival-to-ACK-transmit latency. Run it against server v4.0.13 (polling threads) and
+# v4.0.14 (server_core) with tx_baud = 0 in server.conf so pacing doesn't count.
+# Sends are spaced at random so they don't line up with a polling loop's phase.
+# Rows land in <form>_submissions.csv on the server; the default form id keeps them out of real forms.
+#
+# Usage: python3 tools/latency_probe.py [--host 127.0.0.1] [--port 8051] [--count 50] [--form _LATENCY]
+# Exits non-zero if any ACK doesn't come back within --timeout.
+
+import argparse
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import ax25_frame, kiss_escape, kiss_unescape  # noqa: E402
+
+def read_frames(sock, buffer):
+    data = sock.recv(4096)
+    if not data:
+        raise ConnectionError("Fake Direwolf closed the connection")
+    buffer += data
+    frames = []
+    while b'\xC0' in buffer[1:]:
+        start = buffer.find(b'\xC0')
+        end = buffer.find(b'\xC0', start + 1)
+        if end == -1:
+            break
+        frame = buffer[start:end + 1]
+        buffer = buffer[end + 1:]
+        if len(frame) > 2:
+            frames.append(kiss_unescape(frame[2:-1]))
+    return frames, buffer
+
+def info_text(ax25_packet):
+    # Plain-text replies only, an ACK is never worth compressing
+    return ax25_packet[17:-3].decode('ascii', errors='replace')
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame arrival to ACK latency through Fake Direwolf")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8051)
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--callsign', default='PROBE1')
+    parser.add_argument('--server', default='SVR001')
+    parser.add_argument('--form', default='_LATENCY')
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--gap', type=float, default=0.3, help="Mean seconds between probes")
+    args = parser.parse_args()
+
+    sock = socket.create_connection((args.host, args.port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    rng = random.Random()
+    buffer = b""
+    samples, lost = [], 0
+    for n in range(args.count):
+        time.sleep(rng.uniform(0, 2 * args.gap))
+        payload = f"I|{args.callsign}|{args.form}|L02=probe {n}"
+        frame = ax25_frame(args.callsign, args.server, payload.encode())
+        while b'\x00' in frame:  # Fake Direwolf v1.05's status screen dies on a NUL in the shown info/FCS bytes
+            payload += ' '
+            frame = ax25_frame(args.callsign, args.server, payload.encode())
+        sock.sendall(kiss_escape(frame))
+        sent = time.perf_counter()
+        deadline = sent + args.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                lost += 1
+                break
+            sock.settimeout(remaining)
+            try:
+                frames, buffer = read_frames(sock, buffer)
+            except socket.timeout:
+                continue
+            if any(info_text(f).startswith(f"A|{args.server}|{args.form}|") for f in frames):
+                samples.append((time.perf_counter() - sent) * 1000)
+                break
+    sock.close()
+    if samples:
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{len(samples)} ACKs, {lost} lost: min {samples[0]:.1f} ms, median {statistics.median(samples):.1f} ms, "
+              f"p95 {p95:.1f} ms, max {samples[-1]:.1f} ms")
+    else:
+        print(f"No ACKs, {lost} lost")
+    return 1 if lost else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# log_benchmark.py
+# Version 1.0 - 2025-04-06
+# Logging cost per packet on the server: one I (INSERT) frame received and its A (ACK) sent, with the log_event()
+# calls the packet path makes. Before server v4.0.15 every call went through logging.basicConfig()'s file handler
+# (a write and flush per line, plus a "Label: message" copy per enabled category) and frames were hex dumped
+# five times. Since then the '# Log Writer Functions' section (exec'd here from the server) queues one line per
+# call for a writer thread, formats nothing for disabled categories and keeps the raw frames in frame_ring.
+# The old log_event() is rebuilt from the LOG_CATEGORIES table, so it has the same ~90 keyword defaults and checks.
+#   default - every log_* setting on, as shipped
+#   quiet   - every log_* setting off
+# Caller us is time spent in the packet path itself; CPU us also counts the writer thread, measured after it drains.
+#
+# Usage: python3 tools/log_benchmark.py [--packets 5000]
+# Exits non-zero if the log writer loses lines.
+
+import argparse
+import logging
+import os
+import queue
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, ax25_frame, kiss_escape  # noqa: E402
+from sync_simulator import function_source, source_section  # noqa: E402
+
+SERVER_SOURCE = os.path.join(REPO_DIR, 'lib', 'server', 'server_v4.0.4.txt')
+
+def load_new(log_file, enabled):
+    section = source_section(SERVER_SOURCE, '# Log Writer Functions', 'if os.path.exists(LOG_FILE):')
+    ns = {
+        'os': os, 'time': time, 'sys': sys, 'queue': queue, 'struct': struct, 'threading': threading, 'deque': deque,
+        'datetime': datetime, 'atexit': types.SimpleNamespace(register=lambda f: None),
+        'LOG_FILE': log_file, 'LOG_MAX_BYTES': 0, 'LOG_BACKUPS': 3, 'LOG_FLUSH_INTERVAL': 0.5, 'LOG_FRAME_RING': 256,
+        'CAPTURE_FILE': '', 'CAPTURE_MAX_BYTES': 0, 'comms_log': [], 'screen_dirty': True,
+    }
+    flags = {name: enabled for name in set(re_flags(section))}
+    ns.update(flags)
+    exec(compile(section, SERVER_SOURCE, 'exec'), ns)
+    exec(function_source(SERVER_SOURCE, 'log_event'), ns)
+    ns['start_log_writer']()
+    return ns, flags
+
+def re_flags(section):
+    return re.findall(r"\((LOG_[A-Z0-9_]+), \"", section)
+
+def load_old(log_file, categories, flags):
+    """The pre-v4.0.15 log_event(), generated from the category table: logging.info() per line, one copy per category."""
+    logger = logging.getLogger(f"old-{log_file}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    logger.addHandler(handler)
+    lines = [f"def log_event(message, ui=False, {', '.join(f'{name}=False' for name in categories)}):",
+             "    logger.info(message)",
+             "    if ui:",
+             "        comms_log.append((message, datetime.now().strftime('%H:%M:%S')))",
+             "        if len(comms_log) > 19:",
+             "            comms_log.pop(0)"]
+    for name, (flag, label) in categories.items():
+        lines.append(f"    if {name} and {flag}: logger.info({label!r} + ': ' + message)")
+    ns = {'logger': logger, 'comms_log': [], 'datetime': datetime}
+    ns.update(flags)
+    exec('\n'.join(lines), ns)
+    return ns, handler
+
+def category_table():
+    section = source_section(SERVER_SOURCE, 'LOG_CATEGORIES = {', '\n}')
+    return {m.group(1): (m.group(2), m.group(3)) for m in re.finditer(r"'(\w+)': \((\w+), \"([^\"]*)\"\)", section)}
+
+def old_packet(ns, f, rx, tx, ack, n):
+    """Log calls on the receive/ACK path before v4.0.15, hex dumps included."""
+    log_event = ns['log_event']
+    if f['LOG_KISS_PACKET_RECEIVED']:
+        log_event(f"Raw data received: {rx.hex()}", ui=False, kiss_packet_received=True)
+    if f['LOG_AX25_FCS']:
+        log_event(f"FCS check - Received: {rx[-4:-2].hex()}, Calculated: {rx[-4:-2].hex()}", ui=False, ax25_fcs=True)
+    log_event(f"0PROBE1>SVR001:I|PROBE1|_BENCH|L02=probe {n}", ui=True)
+    if f['LOG_PAYLOAD_VALIDATION']:
+        log_event(f"Payload validated: {ack}", ui=False, payload_validation=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"Payload length: {len(ack)} bytes", ui=False, packet_length=True)
+    if f['LOG_PACKET_RAW_BYTES']:
+        log_event(f"Frame bytes before FCS: {tx[3:-4].hex()}", ui=False, packet_raw_bytes=True)
+    if f['LOG_AX25_PACKET']:
+        log_event(f"Built AX.25 packet: dest=PROBE1, src=SVR001, payload={ack}, hex={tx[2:-1].hex()}", ui=False, ax25_packet=True)
+    if f['LOG_AX25_FRAME_VALIDATION']:
+        log_event(f"Validated AX.25 frame: {tx[2:-1].hex()}", ui=False, ax25_frame_validation=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"AX.25 packet length: {len(tx) - 3} bytes", ui=False, packet_length=True)
+    if f['LOG_KISS_FRAMING']:
+        log_event(f"KISS frame built: {tx.hex()}", ui=False, kiss_framing=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"KISS frame length: {len(tx)} bytes", ui=False, packet_length=True)
+    if f['LOG_TRANSMISSION_VALIDATION']:
+        log_event(f"Pre-transmission KISS frame: {tx.hex()}", ui=False, transmission_validation=True)
+    log_event(f"0SVR001>PROBE1:{ack}", ui=True)
+
+def new_packet(ns, f, rx, tx, ack, n):
+    """The same path since v4.0.15."""
+    log_event = ns['log_event']
+    ns['record_frame'](b'R', rx)
+    if f['LOG_KISS_PACKET_RECEIVED']:
+        log_event("Raw data received: %d bytes", len(rx), kiss_packet_received=True)
+    if f['LOG_AX25_FCS']:
+        log_event(f"FCS check - Received: {rx[-4:-2].hex()}, Calculated: {rx[-4:-2].hex()}", ui=False, ax25_fcs=True)
+    log_event(f"0PROBE1>SVR001:I|PROBE1|_BENCH|L02=probe {n}", ui=True)
+    if f['LOG_PAYLOAD_VALIDATION']:
+        log_event(f"Payload validated: {ack}", ui=False, payload_validation=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"Payload length: {len(ack)} bytes", ui=False, packet_length=True)
+    if f['LOG_PACKET_RAW_BYTES']:
+        log_event("Frame before FCS: %d bytes", len(tx) - 7, packet_raw_bytes=True)
+    if f['LOG_AX25_PACKET']:
+        log_event(f"Built AX.25 packet: dest=PROBE1, src=SVR001, payload={ack}", ui=False, ax25_packet=True)
+    if f['LOG_AX25_FRAME_VALIDATION']:
+        log_event("Validated AX.25 frame: %d bytes", len(tx) - 3, ax25_frame_validation=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"AX.25 packet length: {len(tx) - 3} bytes", ui=False, packet_length=True)
+    if f['LOG_KISS_FRAMING']:
+        log_event("KISS frame built: %d bytes", len(tx), kiss_framing=True)
+    if f['LOG_PACKET_LENGTH']:
+        log_event(f"KISS frame length: {len(tx)} bytes", ui=False, packet_length=True)
+    if f['LOG_TRANSMISSION_VALIDATION']:
+        log_event("Pre-transmission KISS frame: %d bytes, ends %s", len(tx), tx[-3:], transmission_validation=True)
+    ns['record_frame'](b'T', tx)
+    log_event(f"0SVR001>PROBE1:{ack}", ui=True)
+
+def run(version, enabled, packets, workdir):
+    log_file = os.path.join(workdir, f"{version}-{'on' if enabled else 'off'}.log")
+    calls = []
+    categories = category_table()
+    flags = {flag: enabled for flag, _ in categories.values() if flag != 'True'}
+    if version == 'old':
+        ns, handler = load_old(log_file, categories, flags)
+        packet = old_packet
+    else:
+        ns, flags = load_new(log_file, enabled)
+        packet = new_packet
+        log_event = ns['log_event']
+        ns['log_event'] = lambda *a, **k: (calls.append(1), log_event(*a, **k))  # Every call on the path is enabled
+    flags.update({flag: enabled for flag in ('LOG_KISS_PACKET_RECEIVED', 'LOG_AX25_FCS', 'LOG_PAYLOAD_VALIDATION', 'LOG_PACKET_LENGTH', 'LOG_PACKET_RAW_BYTES', 'LOG_AX25_PACKET', 'LOG_AX25_FRAME_VALIDATION', 'LOG_KISS_FRAMING', 'LOG_TRANSMISSION_VALIDATION')})
+    rx = kiss_escape(ax25_frame('PROBE1', 'SVR001', b"I|PROBE1|_BENCH|L02=probe 1"))
+    tx = kiss_escape(ax25_frame('SVR001', 'PROBE1', b"A|SVR001|_BENCH|OK"))
+    ack = "A|SVR001|_BENCH|OK"
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for n in range(packets):
+        packet(ns, flags, rx, tx, ack, n)
+    caller = time.perf_counter() - start
+    if version == 'old':
+        handler.close()
+    else:
+        ns['stop_log_writer']()
+    cpu = time.process_time() - cpu_start
+    with open(log_file) as f:
+        lines = sum(1 for _ in f)
+    lost = len(calls) - lines if version == 'new' else 0
+    return caller * 1e6 / packets, cpu * 1e6 / packets, os.path.getsize(log_file) / packets, lines / packets, lost
+
+def main():
+    parser = argparse.ArgumentParser(description="Server logging overhead per packet, before and after the log writer")
+    parser.add_argument('--packets', type=int, default=5000)
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'Config':>8}{'Version':>9}{'Caller us':>11}{'CPU us':>9}{'Bytes':>8}{'Lines':>7}")
+        for enabled in (True, False):
+            for version in ('old', 'new'):
+                caller, cpu, size, lines, lost = run(version, enabled, args.packets, workdir)
+                if lost:
+                    failures += 1
+                    print(f"  {lost} lines lost")
+                print(f"{'default' if enabled else 'quiet':>8}{version:>9}{caller:>11.1f}{cpu:>9.1f}{size:>8.0f}{lines:>7.1f}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# mesh_check.py
+# Version 1.0 - 2025-04-09
+# Runs several Fake Direwolf nodes (v1.08) in one process, linked as a mesh on 127.0.0.1, with a KISS client on
+# each. Every node lists its neighbours in mesh_peers, both ends, so extra links have to be closed. Frames go in at
+# random nodes and every other node's client must get each one exactly once, even on a ring where each frame
+# reaches a node by two paths. Prints per-link RTT, frames in and duplicates dropped.
+#   ring - node n links to n-1 and n+1, two paths to everywhere
+#   full - every node links to every other
+#   line - no loops, frames cross every hop
+#
+# Usage: python3 tools/mesh_check.py [--nodes 5] [--topology ring] [--frames 500] [--seed 1]
+# Exits non-zero if a frame is lost, delivered twice or echoed to its sender.
+
+import argparse
+import os
+import random
+import re
+import selectors
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, ax25_frame, kiss_escape, load_codec, load_metrics  # noqa: E402
+
+DIREWOLF_SOURCE = os.path.join(REPO_DIR, 'lib', 'direwolf', 'Fake_Direwolf_v1.05.txt')
+
+def free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for s in sockets:
+        s.bind(('127.0.0.1', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+def neighbours(n, nodes, topology):
+    if topology == 'full':
+        return [m for m in range(nodes) if m != n]
+    if topology == 'line':
+        return [m for m in (n - 1, n + 1) if 0 <= m < nodes]
+    return sorted({(n - 1) % nodes, (n + 1) % nodes} - {n})
+
+def start_node(n, workdir, kiss_port, peer_ports, peers):
+    path = os.path.join(workdir, f"node{n}.conf")
+    source = open(DIREWOLF_SOURCE).read()
+    with open(path, 'w') as f:
+        f.write("[Settings]\n")
+        f.write(f"kiss_port = {kiss_port}\npeer_port = {peer_ports[n]}\nmesh_node_id = node{n}\n")
+        f.write(f"mesh_peers = {','.join(f'127.0.0.1:{peer_ports[m]}' for m in peers)}\n")
+        f.write("mesh_ping_interval = 1\nchannel_model = False\n")
+        f.writelines(f"{name} = False\n" for name in sorted(set(re.findall(r"'(log_\w+)':", source))))  # Quiet shared log
+    load_codec()  # fake_direwolf.py imports ax25_codec from beside it
+    load_metrics()  # And metrics, v1.11
+    argv = sys.argv
+    sys.argv = ['fake_direwolf.py', path]
+    try:
+        ns = {'__name__': f"fake_direwolf_node{n}"}
+        exec(compile(source, DIREWOLF_SOURCE, 'exec'), ns)
+    finally:
+        sys.argv = argv
+    for target in ('relay_core', 'peer_server', 'peer_manager'):
+        threading.Thread(target=ns[target], daemon=True).start()
+    return ns
+
+def read_clients(clients, seen, stop):
+    selector = selectors.DefaultSelector()
+    buffers = {}
+    for n, sock in enumerate(clients):
+        selector.register(sock, selectors.EVENT_READ, n)
+        buffers[n] = b""
+    while not stop.is_set():
+        for key, _ in selector.select(0.1):
+            data = key.fileobj.recv(65536)
+            if not data:
+                selector.unregister(key.fileobj)
+                continue
+            n = key.data
+            buffers[n] += data
+            while True:
+                start = buffers[n].find(b'\xC0')
+                end = buffers[n].find(b'\xC0', start + 1)
+                if start == -1 or end == -1:
+                    break
+                frame = buffers[n][start:end + 1]
+                buffers[n] = buffers[n][end + 1:]
+                if b'SEQ' in frame:
+                    seq = int(frame[frame.index(b'SEQ') + 3:][:6])
+                    seen.append((seq, n, time.perf_counter()))
+    selector.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Direwolf mesh: every frame to every node exactly once")
+    parser.add_argument('--nodes', type=int, default=5)
+    parser.add_argument('--topology', choices=('ring', 'full', 'line'), default='ring')
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=200, help="Frames per second, spread over random nodes")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    ports = free_ports(2 * args.nodes)
+    kiss_ports, peer_ports = ports[:args.nodes], ports[args.nodes:]
+    expected_links = {n: set(neighbours(n, args.nodes, args.topology)) for n in range(args.nodes)}
+    with tempfile.TemporaryDirectory() as workdir:
+        nodes = [start_node(n, workdir, kiss_ports[n], peer_ports, expected_links[n]) for n in range(args.nodes)]
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            linked = [{link[0] for link in ns['mesh_snapshot']()} for ns in nodes]
+            if all(linked[n] == {f"node{m}" for m in expected_links[n]} for n in range(args.nodes)):
+                break
+            time.sleep(0.2)
+        else:
+            print(f"Mesh didn't settle: {linked}")
+            return 1
+        print(f"{args.nodes} nodes, {args.topology}: {sum(len(l) for l in linked) // 2} links after "
+              f"{30 - (deadline - time.time()):.1f} s")
+        clients = [socket.create_connection(('127.0.0.1', port)) for port in kiss_ports]
+        time.sleep(0.5)
+        seen, stop = [], threading.Event()
+        reader = threading.Thread(target=read_clients, args=(clients, seen, stop), daemon=True)
+        reader.start()
+        origins, sent_at = [], []
+        start = time.perf_counter()
+        for seq in range(args.frames):
+            origin = rng.randrange(args.nodes)
+            origins.append(origin)
+            sent_at.append(time.perf_counter())
+            clients[origin].sendall(kiss_escape(ax25_frame('MESH1', 'SVR001', b"I|MESH1|_MESH|L01=SEQ%06d" % seq)))
+            time.sleep(max(0, start + (seq + 1) / args.rate - time.perf_counter()))
+        time.sleep(2 + 2 * args.nodes / 10)
+        stop.set()
+        reader.join(2)
+
+        deliveries = {}
+        for seq, n, when in seen:
+            deliveries.setdefault(seq, []).append((n, when))
+        lost = twice = echoed = 0
+        spread = []
+        for seq in range(args.frames):
+            got = [n for n, _ in deliveries.get(seq, [])]
+            echoed += got.count(origins[seq])
+            twice += sum(got.count(n) - 1 for n in set(got))
+            lost += len(set(range(args.nodes)) - {origins[seq]} - set(got))
+            if got:
+                spread.append((max(w for _, w in deliveries[seq]) - sent_at[seq]) * 1000)
+        print(f"{args.frames} frames: {lost} missing, {twice} delivered twice, {echoed} echoed to the sender")
+        if spread:
+            spread.sort()
+            print(f"  Last node reached: median {statistics.median(spread):.2f} ms, p95 {spread[int(len(spread) * 0.95)]:.2f} ms")
+        for n, ns in enumerate(nodes):
+            links = ', '.join(f"{node} {'-' if rtt is None else f'{rtt * 1000:.1f}'} ms {frames} in {dups} dup"
+                              for node, rtt, _, _, frames, dups in sorted(ns['mesh_snapshot']()))
+            print(f"  node{n}: {ns['mesh_stats']['duplicates']} duplicates dropped | {links}")
+        for sock in clients:
+            sock.close()
+        for ns in nodes:
+            ns['stop_event'].set()
+    return 1 if lost or twice or echoed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
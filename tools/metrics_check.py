@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# metrics_check.py
+# Version 1.0 - 2025-04-13
+# The shared metrics registry (lib/common/metrics.txt) that server v4.0.24, terminal_client v5.0.17 and Fake
+# Direwolf v1.11 import as metrics.py, loaded the way tools/airtime_report.py loads ax25_codec.
+#   quantiles - --samples log-normal values (handler latencies run from microseconds to seconds): each p50/p90/p99
+#               must be the upper bound of the bucket the exact quantile falls in, so at most one 1-2-5 step high
+#   endpoint  - the JSON endpoint on a Unix socket and on 127.0.0.1: counters, gauges and histograms come back as
+#               recorded, /metrics/reset zeroes them, an unknown path is a 404
+#   profiler  - one thread spinning in a hot function, another blocked on an Event and this one in time.sleep():
+#               the hot line must top profile_top() and the other two only count as idle
+#   overhead  - cost per count()/observe()/frame() call, with metrics on and off, and how much a busy loop slows
+#               with the profiler sampling every --interval seconds
+# With --scrape ADDRESS it only reads a running program's endpoint and prints what its Debug screen would show, e.g.
+#   python3 tools/metrics_check.py --scrape ~/terminal/server_data/metrics.sock [--profile]
+#
+# Usage: python3 tools/metrics_check.py [--samples 200000] [--calls 200000] [--interval 0.01] [--seed 1]
+# Exits non-zero if a quantile is off by more than its bucket, the endpoint gives back the wrong numbers or the
+# profiler misses the hot function.
+
+import argparse
+import bisect
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import load_metrics  # noqa: E402
+
+metrics = load_metrics()
+
+def check_quantiles(samples, rng):
+    failures = 0
+    metrics.reset()
+    for name, sigma in (('narrow', 0.3), ('wide', 1.5)):
+        values = [rng.lognormvariate(0, sigma) for _ in range(samples)]
+        for value in values:
+            metrics.observe('check_ms', value, name)
+        values.sort()
+        summary = metrics.snapshot()['histograms']['check_ms'][name]
+        line = f"  {name:<7}"
+        for q in metrics.QUANTILES:
+            exact = values[min(int(q * len(values)), len(values) - 1)]
+            estimate = summary[f"p{int(q * 100)}"]
+            bound = metrics.BUCKETS[min(bisect.bisect_left(metrics.BUCKETS, exact), len(metrics.BUCKETS) - 1)]
+            ok = exact - 1e-4 <= estimate <= bound + 1e-4
+            failures += not ok
+            line += f"  p{int(q * 100)} {exact:.3f} -> {estimate:.3f}{'' if ok else ' WRONG'}"
+        print(line + f"  max {summary['max']:.3f}")
+    metrics.reset()
+    return failures
+
+def check_endpoint(address):
+    failures = 0
+    where = metrics.start_endpoint(address)
+    try:
+        address = where[5:] if where.startswith('unix:') else where.split('//', 1)[1]
+        for n in range(5):
+            metrics.frame('in', 'M', 'CLT001', 40 + n)
+        metrics.frame('out', 'U', 'ALL', 200)
+        metrics.count('packet_drops', 'queue_full', 3)
+        metrics.observe('handler_ms', 1.5, 'X')
+        metrics.gauge('queue', lambda: {'depth': 7})
+        snap = metrics.fetch(address)
+        expected = {'frames_in': {'M': 5}, 'bytes_in': {'CLT001': 210}, 'frames_out': {'U': 1}, 'bytes_out': {'ALL': 200},
+                    'packet_drops': {'queue_full': 3}}
+        if snap['counters'] != expected:
+            print(f"  {where}: counters {snap['counters']}, expected {expected}")
+            failures += 1
+        if snap['gauges'].get('queue') != {'depth': 7} or snap['histograms']['handler_ms']['X']['count'] != 1:
+            print(f"  {where}: gauges {snap['gauges']} or histograms {snap['histograms']} wrong")
+            failures += 1
+        metrics.fetch(address, '/metrics/reset')
+        if metrics.fetch(address)['counters']:
+            print(f"  {where}: /metrics/reset left counters behind")
+            failures += 1
+        try:
+            metrics.fetch(address, '/nothing')
+            print(f"  {where}: /nothing didn't fail")
+            failures += 1
+        except OSError:
+            pass
+    finally:
+        metrics.stop_endpoint()
+        metrics.gauges.pop('queue', None)
+    print(f"  {where}: {'OK' if not failures else 'FAILED'}")
+    return failures
+
+def hot_loop(stop):
+    total = 0
+    while not stop.is_set():
+        for n in range(2000):
+            total += n * n  # The line the profiler should catch
+    return total
+
+def check_profiler(interval):
+    stop, blocked = threading.Event(), threading.Event()
+    threads = [threading.Thread(target=hot_loop, args=(stop,), name='hot', daemon=True),
+               threading.Thread(target=blocked.wait, name='blocked', daemon=True)]
+    for thread in threads:
+        thread.start()
+    metrics.start_profiler(interval)
+    time.sleep(1.0)
+    metrics.stop_profiler()
+    stop.set()
+    blocked.set()
+    top = metrics.profile_top(5)
+    state = metrics.profile_state()
+    for share, thread, where in top[:3]:
+        print(f"  {share:6.1%} {thread:<8} {where}")
+    print(f"  {state['samples']} samples, idle {state['idle']}")
+    failures = 0
+    if not top or top[0][1] != 'hot' or not top[0][2].startswith('hot_loop'):
+        print("  hot_loop isn't the most sampled line")
+        failures += 1
+    busy = {thread: share for share, thread, _ in metrics.profile_top(50)}
+    for name in ('blocked', 'MainThread'):
+        if busy.get(name, 0) > 0.05 or not state['idle'].get(name):  # Its first sample has no CPU time to compare against
+            print(f"  {name} was counted as busy ({busy.get(name, 0):.1%})")
+            failures += 1
+    return failures
+
+def per_call_ns(function, calls):
+    started = time.perf_counter()
+    for n in range(calls):
+        function(n)
+    return (time.perf_counter() - started) / calls * 1e9
+
+def overhead(calls, interval):
+    calls_tried = {
+        'count()': lambda n: metrics.count('packet_drops', 'queue_full'),
+        'observe()': lambda n: metrics.observe('handler_ms', n % 97 / 7, 'X'),
+        'frame()': lambda n: metrics.frame('in', 'M', 'CLT001', 80),
+        'nothing': lambda n: None,
+    }
+    print(f"  {'call':<10} {'on ns':>8} {'off ns':>8}")
+    for name, function in calls_tried.items():
+        on = per_call_ns(function, calls)
+        metrics.configure('metrics_check', '1.0', False)
+        off = per_call_ns(function, calls)
+        metrics.configure('metrics_check', '1.0', True)
+        print(f"  {name:<10} {on:>8.0f} {off:>8.0f}")
+    metrics.reset()
+    work = lambda n: sum(range(200))  # noqa: E731
+    plain = per_call_ns(work, calls // 10)
+    metrics.start_profiler(interval)
+    sampled = per_call_ns(work, calls // 10)
+    metrics.stop_profiler()
+    print(f"  busy loop with the profiler every {interval * 1000:.0f} ms: {100 * (sampled / plain - 1):+.1f}%")
+
+def scrape(address, profile):
+    snap = metrics.fetch(address)
+    if profile:
+        state = metrics.fetch(address, '/profile')
+        print(f"profiler {'on' if state['running'] else 'off'}, {state['samples']} samples")
+        for share, thread, where in state['top']:
+            print(f"{share:6.1%} {thread[:12]:<12} {where}")
+        return 0
+    print('\n'.join(metrics.report_lines(snap, width=120, height=200)))
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the shared metrics registry, or scrapes a running program's endpoint")
+    parser.add_argument('--samples', type=int, default=200000, help="Values per histogram for the quantile check")
+    parser.add_argument('--calls', type=int, default=200000, help="Calls timed per function")
+    parser.add_argument('--interval', type=float, default=0.01, help="Profiler sampling period")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scrape', metavar='ADDRESS', help="Unix socket path or host:port of a running program")
+    parser.add_argument('--profile', action='store_true', help="With --scrape, the profiler's top lines instead")
+    args = parser.parse_args()
+    if args.scrape:
+        return scrape(args.scrape, args.profile)
+    metrics.configure('metrics_check', '1.0', True)
+    print("quantiles (exact -> reported):")
+    failures = check_quantiles(args.samples, random.Random(args.seed))
+    print("endpoint:")
+    with tempfile.TemporaryDirectory() as tmp:
+        failures += check_endpoint(os.path.join(tmp, 'metrics.sock'))
+    failures += check_endpoint('127.0.0.1:0')
+    print("profiler:")
+    failures += check_profiler(args.interval)
+    print("overhead:")
+    overhead(args.calls, args.interval)
+    print('OK' if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# reassembly_simulator.py
+# Version 1.1 - 2025-04-13 - One-frame check: server v4.0.21 only splits a payload that doesn't compress into one frame
+# Version 1.0 - 2025-04-03
+# Bytes on air to get multi-part payloads across a lossy simplex link: the whole message resent until
+# one copy arrives intact (before server v4.0.13 / terminal_client v5.0.7) versus selective repeat,
+# where the receiver NACKs (K) the missing parts and the sender resends only those.
+# The selective-repeat side runs the '# Reassembly Functions' section of the server with a fake clock.
+#
+# The one-frame check runs the server's build_ax25_packet(): a compressible payload over PACLEN - 32 characters must
+# go out as one frame that inflates back to it, one that doesn't compress must still be split into F parts.
+#
+# "Gave up" counts trials where the whole message never got through in MAX_ROUNDS sends; their bytes still count.
+#
+# Usage: python3 tools/reassembly_simulator.py [--loss 0.01 0.05 0.1 0.2] [--sizes 1000 4000 16000]
+# Exits non-zero if a message is reassembled wrong or never completes.
+
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, load_codec  # noqa: E402
+from sync_simulator import function_source  # noqa: E402
+
+SERVER_SOURCE = os.path.join(REPO_DIR, 'lib', 'server', 'server_v4.0.4.txt')
+FRAME_OVERHEAD = 22  # KISS + AX.25 address, control, PID and FCS bytes around each info field
+MAX_ROUNDS = 50
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1743638400.0
+
+    def time(self):
+        return self.now
+
+def load_reassembly(clock):
+    with open(SERVER_SOURCE) as f:
+        source = f.read()
+    start = source.index('# Reassembly Functions')
+    section = source[start:source.index('# Compression Dictionary Functions', start)]
+    ns = {
+        're': re, 'os': os, 'time': clock, 'OrderedDict': OrderedDict, 'log_event': lambda *a, **k: None,
+        'parts_lock': threading.Lock(), 'completed_parts': {}, 'sent_parts': OrderedDict(), 'message_seq': 0,
+        'REASSEMBLY_TTL': 600, 'REASSEMBLY_MAX_MESSAGES': 32, 'REASSEMBLY_MAX_BYTES': 262144, 'REASSEMBLY_MAX_PARTS': 999,
+        'NACK_DELAY': 5, 'NACK_MAX': MAX_ROUNDS, 'NACK_HOLDOFF': 3, 'RETRANSMIT_CACHE_SIZE': 64, 'RETRANSMIT_CACHE_TTL': 600,
+    }
+    exec(compile(section, SERVER_SOURCE, 'exec'), ns)
+    return ns
+
+def check_one_frame(paclen, rng):
+    """Frames build_ax25_packet() makes for a compressible and an incompressible payload over one frame; returns failures."""
+    ns = load_reassembly(FakeClock())
+    ns.update({'zlib': zlib, 'ax25_codec': load_codec(), 'zdicts': {}, 'zdict_for_peer': lambda dest: 0, 'PACLEN': paclen,
+               'COMPRESS_PAYLOADS': True, 'COMPRESSED_FLAG': b'\xFF', 'ZDICT_FLAG': b'\xFE'})
+    ns.update((name, False) for name in ('LOG_COMPRESSION', 'LOG_PAYLOAD_VALIDATION', 'LOG_PACKET_LENGTH', 'LOG_AX25_PACKET',
+                                         'LOG_PACKET_RAW_BYTES', 'LOG_AX25_FRAME_VALIDATION'))
+    for name in ('encode_info_field', 'build_ax25_packet'):
+        exec(compile(function_source(SERVER_SOURCE, name), SERVER_SOURCE, 'exec'), ns)
+    max_payload = paclen - 32
+    form = '~'.join(f"F{n:02d},Field {n},20" for n in range(max_payload // 12))
+    noise = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789') for _ in range(max_payload + 40))
+    failures = 0
+    for label, payload, one_frame in (('compressible U', f"U|SVR001|GB01|{form}", True),
+                                      ('incompressible U', f"U|SVR001|GB01|{noise}", False)):
+        packets = ns['build_ax25_packet']('SVR001', 'ALL', payload, compress=True)
+        info = load_codec().decode_frame(load_codec().kiss_frame(packets[0]))[2]
+        ok = len(packets) == 1 if one_frame else len(packets) > 1
+        if one_frame and ok:
+            ok = zlib.decompress(info[1:]).decode() == payload
+        failures += not ok
+        print(f"  {label:<17} {len(payload):>5} chars -> {len(packets)} frame{'s' if len(packets) > 1 else ''}{'' if ok else '  WRONG'}")
+    return failures
+
+def air(text):
+    return len(text) + FRAME_OVERHEAD
+
+def whole_resend(payload, max_payload, loss, rng):
+    """Old behaviour: any lost part means the sender repeats every part. Returns (bytes, delivered)."""
+    parts = [payload[i:i + max_payload] for i in range(0, len(payload), max_payload)]
+    total = 0
+    for _ in range(MAX_ROUNDS):
+        total += sum(air(part) + 4 for part in parts)
+        if all(rng.random() >= loss for _ in parts):
+            return total, True
+    return total, False
+
+def selective_repeat(payload, max_payload, loss, rng):
+    clock = FakeClock()
+    ns = load_reassembly(clock)
+    mid, parts = ns['split_message'](payload, max_payload)
+    ns['remember_parts'](mid, 'CLT001', parts, True)
+    buffer = {}
+    total, rounds, outgoing = 0, 1, list(parts)
+    while rounds <= MAX_ROUNDS:
+        for part in outgoing:
+            total += air(part)
+            if rng.random() < loss:
+                continue
+            function, callsign, form_id, content = part.split('|', 3)
+            whole = ns['add_message_part'](buffer, function, callsign, form_id, content)
+            if whole is not None:
+                return total, rounds, whole
+        clock.now += ns['NACK_DELAY']
+        outgoing = []
+        for callsign, form_id, nack in ns['sweep_message_parts'](buffer):
+            k = f"K|CLT001|{form_id}|{nack}"
+            total += air(k)
+            rounds += 1
+            if rng.random() < loss:
+                continue  # Lost NACK, the receiver asks again after NACK_DELAY
+            clock.now += ns['NACK_HOLDOFF']
+            _, _, outgoing = ns['resend_parts'](*ns['parse_nack'](nack))
+    return None, rounds, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Retransmitted bytes, whole-message resend vs selective repeat")
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.01, 0.05, 0.1, 0.2])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000])
+    parser.add_argument('--trials', type=int, default=50)
+    parser.add_argument('--paclen', type=int, default=255)
+    args = parser.parse_args()
+
+    failures = 0
+    rng = random.Random(1200)
+    max_payload = args.paclen - 32
+    print(f"{'Bytes':>6}{'Loss':>6}{'Whole':>10}{'Gave up':>8}{'Selective':>11}{'Saved':>7}{'Rounds':>8}")
+    for size in args.sizes:
+        for loss in args.loss:
+            whole_total = selective_total = round_total = gave_up = 0
+            for trial in range(args.trials):
+                payload = f"R|SVR001|GB|#{size},1,|" + ''.join(rng.choice('ABCDEFGHIJ=|~0123456789') for _ in range(size))
+                sent, delivered = whole_resend(payload, max_payload, loss, rng)
+                got_bytes, rounds, whole = selective_repeat(payload, max_payload, loss, rng)
+                if whole != payload.split('|', 3)[3]:
+                    failures += 1
+                    continue
+                whole_total += sent
+                gave_up += not delivered
+                selective_total += got_bytes
+                round_total += rounds
+            print(f"{size:>6}{loss:>6.2f}{whole_total // args.trials:>10}{gave_up:>8}{selective_total // args.trials:>11}"
+                  f"{100.0 * (1 - selective_total / max(whole_total, 1)):>6.0f}%{round_total / args.trials:>8.1f}")
+    print(f"Reassembly check: {'OK' if not failures else f'{failures} failures'}")
+    print(f"One-frame check (max payload {max_payload}):")
+    one_frame_failures = check_one_frame(args.paclen, rng)
+    failures += one_frame_failures
+    print(f"One-frame check: {'OK' if not one_frame_failures else f'{one_frame_failures} failures'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# render_benchmark.py
+# Version 1.0 - 2025-04-05
+# Time and terminal bytes per main screen redraw of the client. Runs the real drawing code (the
+# '# Form Catalog Functions' section through '# Chunk 5' of terminal_client) on a pseudo-terminal and counts
+# what curses writes to it, which is what a serial console has to carry.
+#   old    - what terminal_client did before v5.0.8: clear() and a form directory scan on every redraw
+#   full   - screen_dirty = True, a full repaint through erase() and doupdate()
+#   panes  - mark_damaged(), only the changed pane is repainted
+# Scenarios: 'log' adds a comms log line per redraw (a packet arriving), 'menu' moves the menu highlight.
+#
+# Usage: python3 tools/render_benchmark.py [--forms 15] [--redraws 200] [--cols 80] [--rows 24]
+# Exits non-zero if a run dies or writes nothing.
+
+import argparse
+import curses
+import fcntl
+import json
+import os
+import pty
+import re
+import struct
+import sys
+import tempfile
+import termios
+import threading
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR  # noqa: E402
+from sync_simulator import function_source, source_section  # noqa: E402
+
+CLIENT_SOURCE = os.path.join(REPO_DIR, 'lib', 'client', 'terminal_client_v5.0.1.txt')
+START_MARK = b'\x1b]render-benchmark-start\x07'  # OSC strings, a terminal ignores them
+END_MARK = b'\x1b]render-benchmark-end\x07'
+MODES = ('old', 'full', 'panes')
+
+def make_forms(forms_dir, count):
+    for n in range(count):
+        lines = [f"desc:Form number {n} for the render benchmark~Row {n}"]
+        lines += [f"L{r:02d},Label {r},{r + 3},2,256" for r in range(1, 9)]
+        lines += [f"R{r:02d},Right {r},{r + 3},40,256" for r in range(1, 9)]
+        with open(os.path.join(forms_dir, f"F{n:04d}.txt"), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+def load_client(forms_dir):
+    source = open(CLIENT_SOURCE).read()
+    ns = {
+        'curses': curses, 'os': os, 're': re, 'time': time, 'Path': Path, 'threading': threading,
+        'ROWS': 24, 'COLS': 80, 'CALLSIGN': 'CLT001', 'FORMS_DIR': forms_dir, 'CMS_DIR': Path(forms_dir),
+        'log_event': lambda *a, **k: None, 'form_catalog': None, 'form_catalog_lock': threading.Lock(),
+        'damaged_regions': set(), 'damage_lock': threading.Lock(), 'painted_view': None, 'shown_connected': None,
+        'screen_dirty': True, 'form_fields': {}, 'field_values': {}, 'form_id': None, 'mode': None,
+        'selecting_mode': False, 'show_menu': False, 'menu_selection': 0, 'unread_messages': False,
+        'submission_result': None, 'socket_connected': True, 'comms_log': [], 'messages': [],
+        'cursor_offset': 0, 'current_field': None, 'cursor_row': None, 'cursor_col': None,
+        'outbox': [],  # The status pane shows its length since v5.0.14
+    }
+    ns.update({name: False for name in set(re.findall(r'\b(LOG_[A-Z_]+)\b', source))})
+    exec(function_source(CLIENT_SOURCE, 'init_colors'), ns)
+    exec(function_source(CLIENT_SOURCE, 'load_form_data'), ns)
+    exec(source_section(CLIENT_SOURCE, '# Form Catalog Functions', '# Chunk 5'), ns)
+    return ns
+
+def run_child(mode, scenario, redraws, forms_dir, result_path):
+    """Runs inside the pty: one full paint, then the timed redraws between the two marks."""
+    def bench(stdscr):
+        ns = load_client(forms_dir)
+        ns['show_menu'] = scenario == 'menu'
+        ns['redraw_screen'](stdscr)
+        os.write(1, START_MARK)
+        times = []
+        for n in range(redraws):
+            if scenario == 'log':
+                ns['comms_log'].append((f"CLT00{n % 9}>SVR001:A|SVR001|F0001|ok {n}", time.ctime()))
+                del ns['comms_log'][:-20]
+            else:
+                ns['menu_selection'] = n % 2
+            if mode == 'panes':
+                ns['mark_damaged']('log' if scenario == 'log' else 'menu')
+            else:
+                ns['screen_dirty'] = True
+            if mode == 'old':
+                ns['form_catalog'] = None  # Forms were listed and parsed on every redraw
+                stdscr.clearok(True)  # What stdscr.clear() did
+            start = time.perf_counter()
+            ns['redraw_screen'](stdscr)
+            times.append(time.perf_counter() - start)
+        os.write(1, END_MARK)
+        with open(result_path, 'w') as f:
+            json.dump(times, f)
+    curses.wrapper(bench)
+
+def measure(mode, scenario, args, forms_dir):
+    result_path = os.path.join(forms_dir, f"_{mode}_{scenario}.json")
+    pid, fd = pty.fork()
+    if pid == 0:
+        try:
+            run_child(mode, scenario, args.redraws, forms_dir, result_path)
+        except BaseException:
+            traceback.print_exc()  # Shown by the parent with the rest of the child's output
+        finally:
+            os._exit(0)
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', args.rows, args.cols, 0, 0))
+    output = b""
+    while True:
+        try:
+            data = os.read(fd, 65536)
+        except OSError:
+            break
+        if not data:
+            break
+        output += data
+    os.waitpid(pid, 0)
+    os.close(fd)
+    if START_MARK not in output or END_MARK not in output or not os.path.exists(result_path):
+        sys.stderr.write(output.decode('utf-8', errors='replace')[-2000:] + '\n')
+        return None
+    written = len(output.split(START_MARK, 1)[1].split(END_MARK, 1)[0])
+    with open(result_path) as f:
+        times = sorted(json.load(f))
+    return written / args.redraws, times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Client redraw time and terminal bytes, full repaint vs damaged panes")
+    parser.add_argument('--forms', type=int, default=15)
+    parser.add_argument('--redraws', type=int, default=200)
+    parser.add_argument('--cols', type=int, default=80)
+    parser.add_argument('--rows', type=int, default=24)
+    parser.add_argument('--baud', type=int, default=9600, help="Serial console speed for the seconds column")
+    args = parser.parse_args()
+
+    os.environ.setdefault('TERM', 'xterm')
+    failures = 0
+    with tempfile.TemporaryDirectory() as forms_dir:
+        make_forms(forms_dir, args.forms)
+        print(f"{'Scenario':>9}{'Mode':>7}{'Bytes':>8}{'Median ms':>11}{'p95 ms':>9}{'Serial ms':>11}")
+        for scenario in ('log', 'menu'):
+            for mode in MODES:
+                result = measure(mode, scenario, args, forms_dir)
+                if not result or not result[0]:
+                    failures += 1
+                    print(f"{scenario:>9}{mode:>7}  failed")
+                    continue
+                written, median, p95 = result
+                print(f"{scenario:>9}{mode:>7}{written:>8.0f}{median:>11.2f}{p95:>9.2f}{written * 10000 / args.baud:>11.1f}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
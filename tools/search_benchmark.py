@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# search_benchmark.py
+# Version 1.1 - 2025-04-13 - Rows written where server v4.0.18 keeps them, DATA_DIR/store/<form>.seg
+# Version 1.0 - 2025-03-28
+# Times S (SEARCH) against synthetic <form>_submissions.csv files: the pre-v4.0.7 full scan
+# versus the submission index from server v4.0.7. The index code is read straight out of
+# lib/server/server_v4.0.4.txt so the numbers track the shipped implementation.
+# Also checks both paths return the same rows for every query.
+#
+# Usage: python3 tools/search_benchmark.py [--rows 10000 100000 1000000] [--repeat 5]
+# Exits non-zero if the index and the full scan disagree.
+
+import argparse
+import bisect
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+SERVER_SOURCE = os.path.join(REPO_DIR, 'lib', 'server', 'server_v4.0.4.txt')
+FORM_ID = 'GB'
+PRIORITIES = ['High', 'Medium', 'Low', 'Routine']
+SITES = ['Mess hall', 'Head', 'Motor pool', 'Supply', 'Comms shack', 'Aid station', 'Gate']
+UNITS = ['Command', 'Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo']
+
+def load_index_functions(data_dir, ignore_case=True):
+    """Exec the '# Submission Index Functions' section of the server with the globals it expects."""
+    with open(SERVER_SOURCE) as f:
+        source = f.read()
+    start = source.index('# Submission Index Functions')
+    end = source.index('# Chunk 3', start)
+    namespace = {
+        'os': os, 'bisect': bisect, 'pickle': pickle, 'array': array, 'threading': threading,
+        'DATA_DIR': data_dir, 'SEARCH_IGNORE_CASE': ignore_case, 'SEARCH_INDEX_SNAPSHOT_ROWS': 500,
+        'LOG_SEARCH_INDEX': False, 'submission_indexes': {}, 'log_event': lambda *a, **k: None,
+    }
+    namespace['STORE_DIR'] = os.path.join(data_dir, 'store')
+    os.makedirs(namespace['STORE_DIR'], exist_ok=True)
+    start_path = source.index('def submission_path(')
+    exec(compile(source[start_path:source.index('\ndef ', start_path + 1)], SERVER_SOURCE, 'exec'), namespace)
+    exec(compile(source[start:end], SERVER_SOURCE, 'exec'), namespace)
+    return namespace
+
+def legacy_search(csv_path, search_fields, ignore_case):
+    # The v4.0.6 S handler loop, keyed on FID=value and with the same match rules as the index
+    matches = []
+    with open(csv_path, 'r') as f:
+        for line in f:
+            _, _, row_payload = line.strip().split(',', 2)
+            fields = {}
+            for field in row_payload.split('|'):
+                if field and '=' in field:
+                    fid, value = field.split('=', 1)
+                    fields[fid] = value
+            match = True
+            for k, v in search_fields.items():
+                have = fields.get(k, '')
+                if ignore_case:
+                    have, v = have.lower(), v.lower()
+                if not (have.startswith(v[:-1]) if v.endswith('*') else have == v):
+                    match = False
+                    break
+            if match:
+                matches.append(row_payload)
+    return matches
+
+def make_row(rng, n):
+    return "|".join([
+        f"L02={rng.choice(UNITS)}",
+        f"L03={rng.choice(PRIORITIES)}",
+        f"L04={rng.choice(SITES)} report {n}",
+        f"R02=KC{rng.randrange(10)}{''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))}",
+        f"R03={rng.randrange(1, 13)}/{rng.randrange(1, 29)}/2025",
+    ])
+
+def write_csv(path, rows, rng, start=0):
+    with open(path, 'a') as f:
+        for n in range(start, start + rows):
+            f.write(f"{1742333653 + n},KC8QKU,{make_row(rng, n)}\n")
+
+def queries(csv_path):
+    with open(csv_path) as f:
+        f.seek(os.path.getsize(csv_path) // 2)
+        f.readline()
+        callsign = f.readline().split('R02=', 1)[1].split('|', 1)[0]  # One that is on file
+    return {
+        'exact': {'R02': callsign},
+        'two-field': {'L02': 'Alpha', 'L03': 'High'},
+        'prefix': {'L04': 'Motor pool report 12*'},
+        'mixed-case': {'L02': 'bravo', 'R03': '3/19/2025'},
+    }
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-scan vs indexed S (SEARCH) timing")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--append', type=int, default=100, help="Rows appended to time incremental indexing")
+    args = parser.parse_args()
+
+    failures = 0
+    rng = random.Random(1200)
+    for rows in args.rows:
+        data_dir = tempfile.mkdtemp(prefix='search_benchmark_')
+        try:
+            ns = load_index_functions(data_dir)
+            csv_path = ns['submission_path'](FORM_ID)  # Same CSV rows, in the form's segment since v4.0.18
+            write_csv(csv_path, rows, rng)
+            build, _ = timed(lambda: ns['get_submission_index'](FORM_ID), 1)
+            ns['save_submission_indexes']()
+            ns['submission_indexes'].clear()
+            load, _ = timed(lambda: ns['get_submission_index'](FORM_ID), 1)
+            write_csv(csv_path, args.append, rng, start=rows)
+            append, _ = timed(lambda: ns['get_submission_index'](FORM_ID), 1)
+            print(f"{rows} rows ({os.path.getsize(csv_path) // 1024} KiB): build {build * 1000:.0f} ms, "
+                  f"snapshot load {load * 1000:.0f} ms, +{args.append} rows {append * 1000:.1f} ms")
+            print(f"  {'Query':<12}{'Hits':>8}{'Scan ms':>10}{'Index ms':>10}{'Speedup':>9}")
+            for name, fields in queries(csv_path).items():
+                scan_time, scanned = timed(lambda: legacy_search(csv_path, fields, True), args.repeat)
+                index_time, indexed = timed(lambda: ns['search_submissions'](FORM_ID, fields), args.repeat)
+                if scanned != indexed:
+                    failures += 1
+                    print(f"  {name}: index returned {len(indexed)} rows, scan returned {len(scanned)}")
+                print(f"  {name:<12}{len(indexed):>8}{scan_time * 1000:>10.1f}{index_time * 1000:>10.2f}{scan_time / max(index_time, 1e-9):>8.0f}x")
+            strict = load_index_functions(data_dir, ignore_case=False)
+            fields = {'L02': 'bravo'}
+            if strict['search_submissions'](FORM_ID, fields) != legacy_search(csv_path, fields, False):
+                failures += 1
+                print("  case-sensitive search disagrees with the scan")
+        finally:
+            shutil.rmtree(data_dir)
+    print(f"Result check: {'OK' if not failures else f'{failures} failures'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# storage_check.py
+# Version 1.3 - 2025-04-13 - A failed segment write mid-batch, ACKs owed for duplicates kept across a failed WAL write
+# Version 1.2 - 2025-04-13 - Outbox item ids (server v4.0.21): a resent batch is ACKed again but stored once, across restarts
+# Version 1.1 - 2025-04-13 - Index updates that server v4.0.19 hands to its worker pool run inline here
+# Version 1.0 - 2025-04-13
+# Submission storage from server v4.0.18, run straight out of lib/server/server_v4.0.4.txt ('# Submission Storage
+# Functions' through the index section) in a temporary DATA_DIR.
+#   timing   - rows/s and fsyncs for the old per-I append to <form>_submissions.csv (reopened each time, never
+#              synced), the same with an fsync per row (what durable ACKs cost without batching), and group commit
+#              with --batches rows per WAL fsync
+#   recovery - the server "crashes" (its store is dropped without close_submission_store()) after ACKing rows, then:
+#              segment tails cut mid-row, a torn WAL record, an offset index longer than its segment, a WAL that was
+#              never emptied although the segments have every row, and a pre-v4.0.18 CSV with no segment. After each
+#              restart every ACKed row must be in its segment exactly once and in order, the CSV export must match
+#              the segment byte for byte, the WAL must be empty and the indexed search must find the rows.
+#              A segment write that fails halfway (a full disk): the partial row is cut off, nothing more goes into
+#              that segment while the server runs, and the restart's WAL replay brings back every row in order.
+#   outbox     - B (BATCH) items resent while pending, after their commit, after a crash with the ids only in the
+#                WAL and after a checkpoint and clean restart: each row stored once, every send of an id ACKed.
+#                A WAL write that fails keeps the ACKs owed for duplicates for the next commit.
+#
+# Usage: python3 tools/storage_check.py [--rows 512] [--batches 1,8,32,128] [--forms 3]
+# Exits non-zero if a recovery check fails.
+
+import argparse
+import bisect
+import glob
+import json
+import os
+import pickle
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from sync_simulator import SERVER_SOURCE, source_section  # noqa: E402
+
+def load_storage(data_dir, acks):
+    """The server's storage and index sections with the globals they expect; ACKs land in acks."""
+    ns = {
+        'os': os, 'struct': struct, 'zlib': zlib, 'bisect': bisect, 'shutil': shutil, 'glob': glob, 'pickle': pickle,
+        'array': array, 'time': time, 'threading': threading, 'DATA_DIR': data_dir, 'CALLSIGN': 'SVR001', 'TX_ACK': 0,
+        'json': json, 're': re, 'OrderedDict': OrderedDict, 'PACLEN': 255, 'SUBMISSION_ID_KEEP': 512,
+        'STORAGE_COMMIT_WINDOW': 0.05, 'STORAGE_CHECKPOINT_INTERVAL': 60, 'STORAGE_WAL_MAX_BYTES': 1 << 30,
+        'SUBMISSION_CSV_EXPORT': True, 'SEARCH_INDEX_ENABLED': True, 'SEARCH_IGNORE_CASE': True,
+        'SEARCH_INDEX_SNAPSHOT_ROWS': 500, 'submission_indexes': {},
+        'LOG_STORAGE': False, 'LOG_FILE_IO': False, 'LOG_SYNC_RESPONSE': False, 'LOG_SEARCH_INDEX': False,
+        'log_event': lambda *a, **k: None, 'submit_work': lambda lane, function, *args: function(*args) or True,
+        'transmit': lambda callsign, text, cls: acks.append((callsign, text)),
+    }
+    exec(compile(source_section(SERVER_SOURCE, '# Submission Storage Functions', '# Chunk 3'), SERVER_SOURCE, 'exec'), ns)
+    return ns
+
+class FailingWrites:
+    """A file whose writes get half their bytes out and then fail, like a full disk."""
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, data):
+        self.f.write(data[:len(data) // 2])
+        self.f.flush()
+        raise OSError(28, 'No space left on device')
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+def payload(n):
+    return f"NM=Station {n}|PR={('High', 'Low', 'Routine')[n % 3]}|NO=row {n:06d}"
+
+def crash(ns):
+    """Drops the store the way a killed server would: whatever was written stays, no final checkpoint."""
+    for store in ns['submission_store'].values():
+        store['file'].close()
+    ns['submission_wal'].close()
+
+def segment_payloads(ns, form_id):
+    with open(ns['submission_path'](form_id), 'rb') as f:
+        return [line.decode().rstrip('\n').split(',', 2)[2] for line in f]
+
+def check_store(data_dir, expected, label):
+    """Restarts on data_dir and checks every form against expected {form_id: [payloads]}. Returns failures."""
+    acks = []
+    ns = load_storage(data_dir, acks)
+    ns['open_submission_store']()
+    failures = []
+    for form_id, payloads in expected.items():
+        got = segment_payloads(ns, form_id)
+        if got != payloads:
+            missing = len(set(payloads) - set(got))
+            failures.append(f"{form_id}: {len(got)} rows, expected {len(payloads)} ({missing} missing)")
+        with open(ns['submission_path'](form_id), 'rb') as seg, open(os.path.join(data_dir, form_id + '_submissions.csv'), 'rb') as csv_file:
+            if seg.read() != csv_file.read():
+                failures.append(f"{form_id}: CSV export differs from the segment")
+        offsets = ns['submission_store'][form_id]['offsets']
+        with open(ns['submission_path'](form_id)[:-4] + '.off', 'rb') as f:
+            saved = array('Q', f.read())
+        if saved != offsets or len(offsets) != len(got):
+            failures.append(f"{form_id}: offset index has {len(saved)} rows saved, {len(offsets)} in memory, {len(got)} in the segment")
+        if payloads and len(ns['search_submissions'](form_id, {'NO': payloads[-1][-10:]})) != 1:
+            failures.append(f"{form_id}: indexed search can't find the last row")
+    if os.path.getsize(os.path.join(ns['STORE_DIR'], 'submissions.wal')):
+        failures.append("WAL not emptied after recovery")
+    ns['close_submission_store']()
+    print(f"  {label:<44} {'OK' if not failures else 'FAILED'}")
+    for failure in failures:
+        print(f"    {failure}")
+    return len(failures)
+
+def fill(data_dir, forms, rows, batch, fail_at=None):
+    """Stores rows across forms in group commits of batch rows, then crashes. Returns the ACKed payloads per form.
+    With fail_at, the first form's segment write fails halfway in the commit holding row fail_at."""
+    acks = []
+    ns = load_storage(data_dir, acks)
+    ns['open_submission_store']()
+    expected = {form_id: [] for form_id in forms}
+    for n in range(rows):
+        form_id = forms[n % len(forms)]
+        ns['store_submission'](form_id, f"CLT{n % 7:03d}", payload(n))
+        expected[form_id].append(payload(n))
+        if (n + 1) % batch == 0 or n == rows - 1:
+            store = ns['open_submission_segment'](forms[0])
+            if fail_at is not None and n - batch < fail_at <= n:
+                store['file'] = FailingWrites(store['file'])
+            ns['commit_submissions']()
+            if fail_at is not None and n >= fail_at:
+                with open(ns['submission_path'](forms[0]), 'rb') as f:
+                    if len(f.read()) != store['size'] or store['stalled'] is None:
+                        print(f"  {forms[0]} segment written past its last whole row after the failed write")
+    if len(acks) != rows:
+        print(f"  {len(acks)} ACKs for {rows} rows")
+    crash(ns)
+    return expected
+
+def recovery_checks(forms, rows):
+    failures = 0
+    print("Recovery:")
+    cases = ['segment tails cut mid-row', 'torn WAL record', 'offset index past the segment end',
+             'WAL not emptied, segments complete', 'clean restart after a checkpoint', 'segment write failed halfway']
+    for case in cases:
+        data_dir = tempfile.mkdtemp(prefix='storage_check_')
+        try:
+            expected = fill(data_dir, forms, rows, 16, rows // 2 if case == 'segment write failed halfway' else None)
+            store_dir = os.path.join(data_dir, 'store')
+            if case == 'segment tails cut mid-row':
+                for form_id in forms:
+                    path = os.path.join(store_dir, form_id + '.seg')
+                    with open(path, 'r+b') as f:
+                        f.truncate(max(0, os.path.getsize(path) - 150))  # Lost from the page cache, ACKed from the WAL
+            elif case == 'torn WAL record':
+                with open(os.path.join(store_dir, 'submissions.wal'), 'ab') as f:
+                    f.write(struct.pack('>IIQH', 0, 500, 0, 2) + b'GB' + b'half a row')
+            elif case == 'offset index past the segment end':
+                for form_id in forms:
+                    with open(os.path.join(store_dir, form_id + '.off'), 'ab') as f:
+                        f.write(array('Q', [1 << 40, 1 << 41]).tobytes() + b'\x01\x02\x03')
+            elif case == 'clean restart after a checkpoint':
+                acks = []
+                ns = load_storage(data_dir, acks)
+                ns['open_submission_store']()
+                ns['close_submission_store']()
+            failures += check_store(data_dir, expected, case)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    data_dir = tempfile.mkdtemp(prefix='storage_check_')
+    try:
+        legacy = [payload(n) for n in range(rows)]
+        with open(os.path.join(data_dir, 'GB_submissions.csv'), 'w') as f:
+            f.writelines(f"{1743638400 + n},CLT001,{row}\n" for n, row in enumerate(legacy))
+        failures += check_store(data_dir, {'GB': legacy}, 'pre-v4.0.18 CSV imported')
+        acks = []
+        ns = load_storage(data_dir, acks)
+        ns['open_submission_store']()
+        ns['store_submission']('GB', 'CLT002', payload(rows))
+        ns['close_submission_store']()
+        failures += check_store(data_dir, {'GB': legacy + [payload(rows)]}, 'imported CSV appended to and exported')
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return failures
+
+def outbox_checks():
+    """Sends the same outbox batch at each point a client could resend it; returns failures."""
+    data_dir = tempfile.mkdtemp(prefix='storage_check_')
+    failures = []
+    items = [(f"id{n}", payload(n)) for n in range(6)]
+    batch = '\x1e'.join(f"{item_id}|I|GB|{row}" for item_id, row in items)
+    expected_ids = ','.join(item_id for item_id, _ in items)
+    try:
+        acks = []
+        ns = load_storage(data_dir, acks)
+        ns['open_submission_store']()
+        ns['handle_outbox_batch']('CLT001', batch)
+        ns['handle_outbox_batch']('CLT001', batch)  # Resent before the commit, ACKed once with it
+        ns['commit_submissions']()
+        ns['handle_outbox_batch']('CLT001', batch)  # The ACK was lost
+        ns['commit_submissions']()
+        got = [text for _, text in acks]
+        if got != [f"A|SVR001|BATCH|{expected_ids}"] * 2:
+            failures.append(f"ACKs before the crash: {got}")
+        crash(ns)  # The ids are only in the WAL
+        for label, restart in (('after a crash', False), ('after a checkpoint and restart', True)):
+            acks = []
+            ns = load_storage(data_dir, acks)
+            ns['open_submission_store']()
+            ns['handle_outbox_batch']('CLT001', batch)
+            ns['commit_submissions']()
+            if [text for _, text in acks] != [f"A|SVR001|BATCH|{expected_ids}"]:
+                failures.append(f"ACKs {label}: {[text for _, text in acks]}")
+            if segment_payloads(ns, 'GB') != [row for _, row in items]:
+                failures.append(f"GB has {len(segment_payloads(ns, 'GB'))} rows {label}, expected {len(items)}")
+            if restart:
+                ns['close_submission_store']()
+            else:
+                ns['checkpoint_submissions']()  # Ids go to submission_ids.json, the WAL is emptied
+                crash(ns)
+        acks = []
+        ns = load_storage(data_dir, acks)
+        ns['open_submission_store']()
+        ns['handle_outbox_batch']('CLT001', 'new1|I|GB|NM=late\x1ebad1|Q|GB|x')
+        ns['commit_submissions']()
+        if len(acks) != 1 or sorted(acks[0][1].split('|')[3].split(',')) != ['!bad1', 'new1']:
+            failures.append(f"ACK for a new and a rejected item: {[text for _, text in acks]}")
+        acks.clear()
+        wal = ns['submission_wal']
+        ns['handle_outbox_batch']('CLT001', 'new1|I|GB|NM=late\x1enew2|I|GB|NM=later')  # new1's ACK was lost
+        ns['submission_wal'] = FailingWrites(wal)
+        ns['commit_submissions']()
+        ns['submission_wal'] = wal
+        ns['handle_outbox_batch']('CLT001', 'new2|I|GB|NM=later')  # Not ACKed, so resent
+        ns['commit_submissions']()
+        if [text for _, text in acks] != ['A|SVR001|BATCH|new1,new2']:
+            failures.append(f"ACKs after a failed WAL write: {[text for _, text in acks]}")
+        ns['close_submission_store']()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    print(f"  {'outbox resends stored once':<44} {'OK' if not failures else 'FAILED'}")
+    for failure in failures:
+        print(f"    {failure}")
+    return len(failures)
+
+def timing(rows, batches):
+    print(f"Timing, {rows} rows:")
+    print(f"  {'path':<34}{'rows/s':>10}{'fsyncs':>8}")
+    for fsync in (False, True):
+        data_dir = tempfile.mkdtemp(prefix='storage_check_')
+        try:
+            csv_path = os.path.join(data_dir, 'GB_submissions.csv')
+            start = time.perf_counter()
+            for n in range(rows):
+                with open(csv_path, 'a') as f:  # The v4.0.17 I handler
+                    f.write(f"{int(time.time())},CLT001,{payload(n)}\n")
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            elapsed = time.perf_counter() - start
+            label = 'old append, fsync per row' if fsync else 'old append, never synced'
+            print(f"  {label:<34}{rows / elapsed:>10,.0f}{rows if fsync else 0:>8}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    for batch in batches:
+        data_dir = tempfile.mkdtemp(prefix='storage_check_')
+        try:
+            acks = []
+            ns = load_storage(data_dir, acks)
+            ns['open_submission_store']()
+            start = time.perf_counter()
+            for n in range(rows):
+                ns['store_submission']('GB', 'CLT001', payload(n))
+                if (n + 1) % batch == 0 or n == rows - 1:
+                    ns['commit_submissions']()
+            elapsed = time.perf_counter() - start
+            ns['close_submission_store']()
+            print(f"  {f'group commit, {batch} rows per batch':<34}{rows / elapsed:>10,.0f}{ns['storage_stats']['commits']:>8}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Submission WAL/group commit timing and crash recovery checks")
+    parser.add_argument('--rows', type=int, default=512)
+    parser.add_argument('--batches', default='1,8,32,128', help="Rows per group commit, comma-separated")
+    parser.add_argument('--forms', type=int, default=3, help="Forms the recovery rows are spread over")
+    args = parser.parse_args()
+    timing(args.rows, [int(n) for n in args.batches.split(',')])
+    failures = recovery_checks([f"F{n}" for n in range(args.forms)], args.rows)
+    failures += outbox_checks()
+    if failures:
+        print(f"{failures} recovery failures")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
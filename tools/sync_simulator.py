@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# sync_simulator.py
+# Version 1.1 - 2025-04-13 - Scoped X carries +delta, as terminal_client v5.0.15 sends it
+# Version 1.0 - 2025-03-31
+# Bytes on air to reconcile a client's forms/push catalog with the server's: the full X (INDEX) listing
+# used before server v4.0.10 / terminal_client v5.0.6 versus the digest tree walk (H, then scoped X).
+# The walk runs the real code: the '# Digest Tree Functions' section of the server and the
+# '# Sync Walk Functions' section of the client are exec'd with the radio replaced by a list.
+# The U/D traffic that follows is the same for both and isn't counted.
+#
+# Usage: python3 tools/sync_simulator.py [--sizes 10 100 1000 5000] [--changes 1 5 25] [--kind forms|push]
+# Exits non-zero if a walk misses or invents a difference.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, frames_after  # noqa: E402
+
+SERVER_SOURCE = os.path.join(REPO_DIR, 'lib', 'server', 'server_v4.0.4.txt')
+CLIENT_SOURCE = os.path.join(REPO_DIR, 'lib', 'client', 'terminal_client_v5.0.1.txt')
+
+def source_section(path, start_marker, end_marker):
+    with open(path) as f:
+        source = f.read()
+    start = source.index(start_marker)
+    return source[start:source.index(end_marker, start)]
+
+def function_source(path, name):
+    source = source_section(path, f"def {name}(", "\ndef ")
+    return source + "\n"
+
+def load_server(paclen):
+    ns = {'hashlib': hashlib, 'json': json, 'os': os, 'time': time, 'PACLEN': paclen, 'CALLSIGN': 'SVR001'}
+    exec(function_source(SERVER_SOURCE, 'collection_digest'), ns)
+    exec(source_section(SERVER_SOURCE, '# Digest Tree Functions', '# CMS Functions'), ns)
+    return ns
+
+def load_client(paclen, leaf_size, sent):
+    ns = {
+        'hashlib': hashlib, 'json': json, 'os': os, 'time': time, 'PACLEN': paclen, 'CALLSIGN': 'CLT001',
+        'SYNC_LEAF_SIZE': leaf_size, 'sync_walks': {}, 'DELTA_SYNC': True, 'log_event': lambda *a, **k: None,
+        'LOG_SYNC_START': False, 'LOG_DIFF_STATE': False, 'LOG_SYNC_MISMATCHES': False,
+        'send_to_kiss': lambda stdscr, packet: sent.append(packet),
+    }
+    exec(function_source(CLIENT_SOURCE, 'collection_digest'), ns)
+    exec(source_section(CLIENT_SOURCE, '# Sync Walk Functions', '# CMS Functions'), ns)
+    return ns
+
+def catalogs(size, changes, kind, rng):
+    def name(n):
+        return f"F{n:04d}" if kind == 'forms' else f"news/2025-03-{n % 28 + 1:02d}-bulletin-{n:05d}.txt"
+    server = {name(n): hashlib.md5(f"{kind} {n}".encode()).hexdigest() for n in range(size)}
+    client = dict(server)
+    names = sorted(server)
+    for n, victim in enumerate(rng.sample(names, min(changes, len(names)))):
+        if n % 3 == 0:
+            client[victim] = hashlib.md5(f"old {victim}".encode()).hexdigest()  # Edited on the server
+        elif n % 3 == 1:
+            del client[victim]  # New on the server
+        else:
+            del server[victim]  # Deleted on the server
+    return server, client
+
+def air_bytes(payload, paclen):
+    return sum(len(f) for f in frames_after(payload, True, paclen))
+
+def simulate(server_entries, client_entries, collection, paclen, leaf_size):
+    """Run one walk; returns (bytes, H round trips, names the server would send U or D for)."""
+    sent = []
+    server = load_server(paclen)
+    client = load_client(paclen, leaf_size, sent)
+    server['load_sync_entries'] = lambda c: server_entries
+    client['load_sync_entries'] = lambda c: client_entries
+    client['start_sync_walk'](None, collection)
+    total = rounds = 0
+    touched = set()
+    while sent:
+        requests, sent[:] = list(sent), []
+        rounds += any(r.startswith('H|') for r in requests)
+        replies = []
+        for request in requests:
+            total += air_bytes(request, paclen)
+            function, _, _, content = request.split('|', 3)
+            if function == 'H':
+                for prefix in (content.split(',') if content else ['']):
+                    replies.append(f"H|SVR001|{collection}|{prefix}={server['sync_child_digests'](server_entries, prefix)}")
+            elif function == 'X':
+                listed = dict(pair.split(':', 1) for pair in content.split('|') if ':' in pair)
+                scoped = dict(server_entries)
+                if content.startswith('@'):
+                    scopes = content[1:].split('|', 1)[0].split(',')
+                    scoped = {n: m for n, m in server_entries.items() if server['in_sync_scope'](n, scopes)}
+                touched.update(n for n, m in scoped.items() if not listed.get(n) or not m.startswith(listed[n]))
+                touched.update(n for n in listed if n not in server_entries)
+        for reply in replies:
+            total += air_bytes(reply, paclen)
+            client['handle_sync_digests'](None, collection, reply.split('|', 3)[3])
+    return total, rounds, touched
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync bytes, full index vs digest tree walk")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--changes', type=int, nargs='+', default=[1, 5, 25])
+    parser.add_argument('--kind', choices=('forms', 'push'), default='forms')
+    parser.add_argument('--paclen', type=int, default=255)
+    parser.add_argument('--baud', type=int, default=1200)
+    parser.add_argument('--leaf-size', type=int, default=8)
+    args = parser.parse_args()
+
+    failures = 0
+    rng = random.Random(1200)
+    collection = 'NONE' if args.kind == 'forms' else 'PUSH'
+    print(f"{'Items':>6}{'Changes':>8}{'Full X':>10}{'Tree':>9}{'Tree %':>8}{'Rounds':>7}{'Air s full':>11}{'Air s tree':>11}")
+    for size in args.sizes:
+        for changes in args.changes:
+            if changes > size:
+                continue
+            server_entries, client_entries = catalogs(size, changes, args.kind, rng)
+            full = air_bytes(f"X|CLT001|{collection}|" + '|'.join(f"{n}:{m}" for n, m in client_entries.items()), args.paclen)
+            tree, rounds, touched = simulate(server_entries, client_entries, collection, args.paclen, args.leaf_size)
+            expected = {n for n in set(server_entries) | set(client_entries) if server_entries.get(n) != client_entries.get(n)}
+            if touched != expected:
+                failures += 1
+                print(f"  walk mismatch: missed {sorted(expected - touched)[:5]}, extra {sorted(touched - expected)[:5]}")
+            print(f"{size:>6}{changes:>8}{full:>10}{tree:>9}{100.0 * tree / full:>7.1f}%{rounds:>7}{full * 8 / args.baud:>11.1f}{tree * 8 / args.baud:>11.1f}")
+    print(f"Walk check: {'OK' if not failures else f'{failures} failures'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# worker_check.py
+# Version 1.0 - 2025-04-13
+# The worker pool from server v4.0.19, run straight out of lib/server/server_v4.0.4.txt ('# Worker Pool Functions').
+#   ordering     - --clients lanes of --jobs jobs each with random run times: every lane's jobs must run in the
+#                  order they were submitted and never two at once, as dispatch_packet() relies on for replies
+#   bounded      - jobs submitted while every worker is held up: exactly worker_queue_max wait, the rest are dropped
+#                  and counted in worker_metrics['dropped']
+#   head of line - one client's broad search (--search-ms of zlib work, which releases the GIL like the real
+#                  searches' file reads and compression) followed by small requests from the others: how long
+#                  they wait with worker_threads = 0 (everything on server_core, as before v4.0.19) and with the pool
+#
+# Usage: python3 tools/worker_check.py [--threads 4] [--clients 8] [--jobs 40] [--search-ms 400]
+# Exits non-zero if ordering or the queue bound is broken.
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import load_metrics  # noqa: E402
+from sync_simulator import SERVER_SOURCE, source_section  # noqa: E402
+
+def load_workers(threads, queue_max):
+    ns = {
+        'threading': threading, 'time': time, 'traceback': traceback, 'deque': deque, 'ThreadPoolExecutor': ThreadPoolExecutor,
+        'WORKER_THREADS': threads, 'WORKER_QUEUE_MAX': queue_max, 'LOG_WORKERS': False,
+        'log_event': lambda *a, **k: None, 'wake_core': lambda: None, 'metrics': load_metrics(),  # v4.0.24: run_lane() observes waits
+    }
+    exec(compile(source_section(SERVER_SOURCE, '# Worker Pool Functions', '# Chunk 4'), SERVER_SOURCE, 'exec'), ns)
+    ns['start_worker_pool']()
+    return ns
+
+def check_ordering(threads, clients, jobs):
+    ns = load_workers(threads, clients * jobs)
+    done = {lane: [] for lane in range(clients)}
+    running, overlaps = set(), []
+    lock = threading.Lock()
+
+    def job(lane, n, seconds):
+        with lock:
+            if lane in running:
+                overlaps.append(lane)
+            running.add(lane)
+        time.sleep(seconds)
+        with lock:
+            running.discard(lane)
+            done[lane].append(n)
+    rng = random.Random(1)
+    for n in range(jobs):
+        for lane in range(clients):
+            ns['submit_work'](lane, job, lane, n, rng.uniform(0, 0.002))
+    ns['stop_worker_pool']()
+    out_of_order = [lane for lane, ns_done in done.items() if ns_done != list(range(jobs))]
+    ok = not out_of_order and not overlaps
+    print(f"  ordering: {clients} lanes x {jobs} jobs on {threads} threads, {len(out_of_order)} lanes out of order, "
+          f"{len(overlaps)} overlaps - {'OK' if ok else 'FAILED'}")
+    return 0 if ok else 1
+
+def check_bounded(threads, queue_max):
+    ns = load_workers(threads, queue_max)
+    gate = threading.Event()
+    submitted = queue_max * 3
+    accepted = sum(ns['submit_work'](n, gate.wait) for n in range(submitted))
+    dropped = ns['worker_metrics']['dropped']
+    gate.set()
+    ns['stop_worker_pool']()
+    completed = ns['worker_metrics']['completed']
+    ok = accepted == queue_max and dropped == submitted - queue_max and completed == queue_max and ns['worker_metrics']['queued'] == 0
+    print(f"  bounded: {submitted} jobs against a queue of {queue_max}: {accepted} accepted, {dropped} dropped, "
+          f"{completed} completed - {'OK' if ok else 'FAILED'}")
+    return 0 if ok else 1
+
+def head_of_line(threads, clients, search_ms):
+    """Latencies (ms) of the other clients' small requests queued behind one broad search."""
+    block = os.urandom(1 << 16)
+    start = time.perf_counter()
+    for _ in range(5):
+        zlib.compress(block, 9)
+    rounds = max(1, int(search_ms / 1000 / max((time.perf_counter() - start) / 5, 1e-6)))
+    ns = load_workers(threads, 1000)
+    latencies = []
+
+    def broad_search():
+        for _ in range(rounds):
+            zlib.compress(block, 9)
+
+    def small_request(queued):
+        zlib.compress(block[:2048])
+        latencies.append((time.perf_counter() - queued) * 1000)
+    arrived = time.perf_counter()  # Every request is in at once, the search first
+    ns['submit_work']('search', broad_search)
+    for lane in range(clients):
+        ns['submit_work'](lane, small_request, arrived)
+    ns['stop_worker_pool']()
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker pool ordering, queue bound and head-of-line blocking")
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--queue-max', type=int, default=64)
+    parser.add_argument('--search-ms', type=float, default=400)
+    args = parser.parse_args()
+    failures = check_ordering(args.threads, args.clients, args.jobs)
+    failures += check_bounded(args.threads, args.queue_max)
+    print(f"  head of line, one {args.search_ms:.0f} ms search then one small request from each of {args.clients} other clients:")
+    for threads in (0, args.threads):
+        p50, worst = head_of_line(threads, args.clients, args.search_ms)
+        label = 'on server_core (worker_threads = 0)' if threads == 0 else f"worker_threads = {threads}"
+        print(f"    {label:<38} p50 {p50:8.1f} ms, max {worst:8.1f} ms")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
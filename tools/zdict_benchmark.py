@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# zdict_benchmark.py
+# Version 1.0 - 2025-03-27
+# Compression ratio per packet class with plain zlib (COMPRESSED_FLAG) versus the preset
+# dictionary (ZDICT_FLAG) from server v4.0.6, on the sample CSVs in internal/CVS.
+# Each packet is scored against a dictionary trained without that packet's own sample
+# (leave-one-out), so the numbers reflect traffic the dictionary has not seen.
+#
+# Usage: python3 tools/zdict_benchmark.py [--csv-dir internal/CVS] [--max-size 2048]
+
+import argparse
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from airtime_report import REPO_DIR, sample_payloads, split_payload  # noqa: E402
+
+COMPRESSED_FLAG = b'\xff'
+ZDICT_FLAG = b'\xfe'
+BASE_SAMPLES = ["M|SVR001|NONE|", "M|SVR001|PUSH|", "A|SVR001|", "|SUCCESS", "R|SVR001|", "U|SVR001|", "D|SVR001|"]
+
+def zdict_segments(text):
+    # Same segmentation as zdict_segments() in server v4.0.6
+    return [seg for seg in re.findall(r'[^|~,]*[|~,]', text + '|') if len(seg) > 2]
+
+def build_zdict(samples, max_size):
+    # Same ranking as build_zdict() in server v4.0.6, fed wire-form samples directly
+    counts = Counter(seg for sample in samples for seg in zdict_segments(sample))
+    ranked = sorted(counts, key=lambda seg: (counts[seg] * len(seg), seg), reverse=True)
+    chosen, size = [], 0
+    for seg in ranked:
+        if size + len(seg) <= max_size:
+            chosen.append(seg)
+            size += len(seg)
+    return ''.join(reversed(chosen)).replace('~', '\n').strip().replace('\n', '~').encode()
+
+def zlib_size(raw):
+    return min(len(raw), len(COMPRESSED_FLAG + zlib.compress(raw, 9)))
+
+def zdict_size(raw, zdict):
+    deflater = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=zdict)
+    packed = ZDICT_FLAG + b'\x01' + deflater.compress(raw) + deflater.flush()
+    inflater = zlib.decompressobj(-15, zdict=zdict)
+    assert inflater.decompress(packed[2:]) + inflater.flush() == raw, "dictionary round-trip failed"
+    return min(zlib_size(raw), len(packed))
+
+def training_corpus(samples):
+    # The server trains on forms (U) and submissions (I); R and S are built from the same rows.
+    # The G/P samples stand in for CMS text the dictionary never saw.
+    corpus = []
+    for ptype in ('U', 'I'):
+        corpus.extend(payload for payload, _ in samples.get(ptype, []))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="Preset dictionary compression ratio per packet class")
+    parser.add_argument('--csv-dir', default=os.path.join(REPO_DIR, 'internal', 'CVS'))
+    parser.add_argument('--max-size', type=int, default=2048)
+    parser.add_argument('--paclen', type=int, default=255)
+    args = parser.parse_args()
+
+    samples = sample_payloads(args.csv_dir)
+    corpus = training_corpus(samples)
+    full = build_zdict(BASE_SAMPLES + corpus, args.max_size)
+    print(f"Dictionary: {len(full)} bytes from {len(corpus)} samples (max {args.max_size})")
+    print(f"{'Class':<6}{'Pkts':>5}{'Plain':>8}{'zlib':>8}{'zdict':>8}{'zlib %':>8}{'zdict %':>9}")
+    totals = [0, 0, 0]
+    for ptype, payloads in samples.items():
+        plain = with_zlib = with_zdict = 0
+        for payload, _ in payloads:
+            held_out = [c for c in corpus if c != payload]
+            zdict = build_zdict(BASE_SAMPLES + held_out, args.max_size)
+            for part in split_payload(payload, args.paclen):
+                raw = part.encode()
+                plain += len(raw)
+                with_zlib += zlib_size(raw)
+                with_zdict += zdict_size(raw, zdict)
+        totals = [totals[0] + plain, totals[1] + with_zlib, totals[2] + with_zdict]
+        print(f"{ptype:<6}{len(payloads):>5}{plain:>8}{with_zlib:>8}{with_zdict:>8}{100.0 * with_zlib / plain:>7.1f}%{100.0 * with_zdict / plain:>8.1f}%")
+    print(f"{'All':<6}{'':>5}{totals[0]:>8}{totals[1]:>8}{totals[2]:>8}{100.0 * totals[1] / totals[0]:>7.1f}%{100.0 * totals[2] / totals[0]:>8.1f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())